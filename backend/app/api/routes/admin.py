@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.schemas.knowledge_base import ReindexStatus
+from app.services.reindex_service import ReindexService
+import structlog
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+async def verify_admin_key(x_admin_key: Optional[str] = Header(default=None)):
+    """Require the admin API key when one is configured"""
+    if settings.admin_api_key and x_admin_key != settings.admin_api_key:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@router.post("/admin/reindex", response_model=ReindexStatus, dependencies=[Depends(verify_admin_key)])
+async def start_reindex(
+    redis = Depends(get_redis)
+):
+    """Rebuild the knowledge base into a new collection and switch the alias"""
+    try:
+        reindex_service = ReindexService(redis)
+        status = await reindex_service.start()
+        
+        logger.info("Reindex requested", state=status.state, collection=status.collection)
+        return status
+        
+    except Exception as e:
+        logger.error("Failed to start reindex", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to start reindex")
+
+@router.get("/admin/reindex", response_model=ReindexStatus, dependencies=[Depends(verify_admin_key)])
+async def get_reindex_status(
+    redis = Depends(get_redis)
+):
+    """Get the status of the latest reindex"""
+    try:
+        reindex_service = ReindexService(redis)
+        return await reindex_service.get_status()
+    except Exception as e:
+        logger.error("Failed to get reindex status", error=str(e))
+        raise HTTPException(status_code=500, detail="Failed to retrieve reindex status")
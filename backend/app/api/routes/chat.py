@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.redis import get_redis
+from app.core.cancellation import ClientDisconnected, cancel_on_disconnect
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.services.chat_service import ChatService
+import json
 import structlog
 
 logger = structlog.get_logger()
@@ -12,6 +15,7 @@ router = APIRouter()
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     db: AsyncSession = Depends(get_db),
     redis = Depends(get_redis)
 ):
@@ -19,8 +23,11 @@ async def chat(
     try:
         chat_service = ChatService(db, redis)
         
-        # Process the chat request
-        response = await chat_service.process_message(request)
+        # Process the chat request, abandoning it if the caller disconnects
+        response = await cancel_on_disconnect(
+            http_request,
+            chat_service.process_message(request)
+        )
         
         logger.info(
             "Chat processed",
@@ -31,6 +38,8 @@ async def chat(
         
         return response
         
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.error(
             "Chat processing failed",
@@ -39,6 +48,47 @@ async def chat(
         )
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    redis = Depends(get_redis)
+):
+    """Streaming chat endpoint; sends response tokens as server-sent events"""
+    chat_service = ChatService(db, redis)
+
+    async def events():
+        # Starlette cancels this generator if the client disconnects mid-stream
+        try:
+            async for event, payload in chat_service.stream_message(request):
+                if event == "token":
+                    yield _sse_event("token", {"text": payload})
+                else:
+                    logger.info(
+                        "Chat streamed",
+                        user_id=request.user_id,
+                        channel=request.channel,
+                        confidence=payload.confidence_score,
+                        first_token_ms=payload.first_token_ms
+                    )
+                    yield _sse_event("done", json.loads(payload.model_dump_json()))
+        except Exception as e:
+            logger.error(
+                "Chat streaming failed",
+                user_id=request.user_id,
+                error=str(e)
+            )
+            yield _sse_event("error", {"detail": "Internal server error"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/chat/session/{user_id}")
 async def get_session(
     user_id: str,
@@ -44,7 +44,7 @@ async def detailed_health_check(
     
     try:
         # Check Qdrant
-        qdrant.get_collections()
+        await qdrant.get_collections()
         health_status["dependencies"]["qdrant"] = "healthy"
     except Exception as e:
         health_status["dependencies"]["qdrant"] = f"unhealthy: {str(e)}"
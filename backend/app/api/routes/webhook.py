@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.redis import get_redis
+from app.core.cancellation import ClientDisconnected, cancel_on_disconnect
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.services.chat_service import ChatService
 import structlog
@@ -36,7 +37,10 @@ async def instagram_webhook(
         )
         
         chat_service = ChatService(db, redis)
-        response = await chat_service.process_message(chat_request)
+        response = await cancel_on_disconnect(
+            request,
+            chat_service.process_message(chat_request)
+        )
         
         # Return response for n8n to send back
         return {
@@ -46,6 +50,8 @@ async def instagram_webhook(
             "confidence_score": response.confidence_score
         }
         
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.error("Instagram webhook failed", error=str(e))
         raise HTTPException(status_code=500, detail="Webhook processing failed")
@@ -76,7 +82,10 @@ async def whatsapp_webhook(
         )
         
         chat_service = ChatService(db, redis)
-        response = await chat_service.process_message(chat_request)
+        response = await cancel_on_disconnect(
+            request,
+            chat_service.process_message(chat_request)
+        )
         
         # Return response for n8n to send back
         return {
@@ -86,6 +95,8 @@ async def whatsapp_webhook(
             "confidence_score": response.confidence_score
         }
         
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.error("WhatsApp webhook failed", error=str(e))
         raise HTTPException(status_code=500, detail="Webhook processing failed")
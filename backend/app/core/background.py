@@ -0,0 +1,30 @@
+from typing import Awaitable, Set
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+# Strong references so fire-and-forget tasks aren't garbage collected mid-flight
+background_tasks: Set[asyncio.Task] = set()
+
+def spawn(work: Awaitable, name: str) -> asyncio.Task:
+    """Run work off the request path, logging instead of raising on failure"""
+    task = asyncio.ensure_future(work)
+    background_tasks.add(task)
+    task.add_done_callback(lambda t: _finished(t, name))
+    return task
+
+def _finished(task: asyncio.Task, name: str):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task failed", task=name, error=str(task.exception()))
+
+async def close_background(timeout: float = 10.0):
+    """Give in-flight background work a chance to finish, then cancel the rest"""
+    if not background_tasks:
+        return
+    _, pending = await asyncio.wait(set(background_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning("Cancelled background tasks on shutdown", count=len(pending))
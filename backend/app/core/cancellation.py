@@ -0,0 +1,40 @@
+from typing import Awaitable, TypeVar
+from fastapi import Request
+import asyncio
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+class ClientDisconnected(Exception):
+    """The caller went away before the response was ready"""
+
+async def _wait_for_disconnect(request: Request):
+    """Return once the server reports the client gone, like StreamingResponse.listen_for_disconnect"""
+    # Routes read the body first, so the next message is the disconnect.
+    # request.is_disconnected() can't be used: behind BaseHTTPMiddleware it
+    # polls in a cancelled scope and never sees the message.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await work, cancelling it (and its in-flight LLM calls) if the client disconnects"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            return task.result()
+        if watcher.exception() is not None:
+            # Can't tell whether the client is still there; let the work finish
+            logger.warning("Disconnect watch failed", url=str(request.url), error=str(watcher.exception()))
+            return await task
+        logger.info("Client disconnected, cancelling request", url=str(request.url))
+        raise ClientDisconnected()
+    finally:
+        for pending in (task, watcher):
+            if not pending.done():
+                pending.cancel()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 
 class Settings(BaseSettings):
@@ -12,10 +12,75 @@ class Settings(BaseSettings):
     # Qdrant
     qdrant_url: str = "http://qdrant:6333"
     qdrant_collection: str = "knowledge_base"
+    qdrant_timeout: int = 10  # seconds
+    qdrant_on_disk_vectors: bool = False  # keep original vectors on disk (mmap)
+    qdrant_hnsw_m: int = 16
+    qdrant_hnsw_ef_construct: int = 100
+    qdrant_hnsw_on_disk: bool = False
+    qdrant_search_hnsw_ef: int = 128
+    qdrant_quantization: str = "int8"  # "int8" (scalar) or "none"
+    qdrant_quantization_quantile: float = 0.99
+    qdrant_quantization_always_ram: bool = True
+    qdrant_quantization_rescore: bool = True  # rescore top hits with original vectors
+    qdrant_quantization_oversampling: float = 2.0
     
     # LLM APIs
     deepseek_api_key: Optional[str] = None
     openai_api_key: Optional[str] = None
+    openai_model: str = "gpt-3.5-turbo"
+    deepseek_base_url: str = "https://api.deepseek.com/v1"
+    deepseek_model: str = "deepseek-chat"
+    
+    # LLM and embedding prices in US cents per million tokens: [prompt, completion]
+    llm_prices: Dict[str, List[float]] = {
+        "deepseek-chat": [27.0, 110.0],
+        "gpt-3.5-turbo": [50.0, 150.0],
+        "text-embedding-ada-002": [10.0, 0.0],
+        "text-embedding-3-small": [2.0, 0.0]
+    }
+    
+    # LLM provider routing
+    llm_providers: str = "deepseek,openai"  # priority order; "mock" adds an in-process test provider
+    llm_request_timeout: float = 8.0  # seconds per provider attempt before failing over
+    llm_first_token_timeout: float = 5.0  # seconds to the first streamed token before failing over
+    llm_latency_window: int = 100  # recent calls kept per provider for latency/error stats
+    llm_breaker_failure_threshold: int = 5  # consecutive failures that open a provider's circuit
+    llm_breaker_reset_timeout: float = 30.0  # seconds an open circuit waits before a probe
+    llm_hedge_enabled: bool = True
+    llm_hedge_quantile: float = 0.95  # hedge once the primary is slower than this latency quantile
+    llm_hedge_min_samples: int = 20  # latency samples needed before hedging a provider
+    llm_mock_latency_ms: int = 200
+    llm_mock_error_rate: float = 0.0
+    
+    # Adaptive per-provider LLM concurrency (token bucket plus AIMD limit)
+    llm_limiter_initial_concurrency: int = 8
+    llm_limiter_min_concurrency: int = 1
+    llm_limiter_max_concurrency: int = 64
+    llm_limiter_rate: float = 20.0  # calls per second admitted by the token bucket
+    llm_limiter_burst: int = 20
+    llm_limiter_latency_target: float = 4.0  # seconds; slower calls count as congestion
+    llm_limiter_backoff: float = 0.5  # multiplicative decrease on 429s or slow calls
+    llm_limiter_cooldown: float = 2.0  # seconds between decreases
+    llm_limiter_queue_timeout: float = 10.0  # seconds a call may wait for a slot
+    llm_channel_priorities: Dict[str, int] = {"whatsapp": 0, "instagram": 1}  # lower is served first
+    
+    # Request coalescing (identical in-flight embedding and LLM calls)
+    single_flight_enabled: bool = True
+    single_flight_redis: bool = False  # also coalesce across workers via a Redis lock and result key
+    single_flight_lock_ttl: float = 15.0  # seconds
+    single_flight_result_ttl: int = 10  # seconds a leader's result stays readable by workers that waited on it
+    single_flight_poll_interval: float = 0.05  # seconds between result checks while another worker leads
+    
+    # LLM HTTP client (shared connection pool)
+    llm_http2: bool = True
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0  # seconds
+    llm_connect_timeout: float = 5.0  # seconds
+    llm_read_timeout: float = 30.0  # seconds between bytes, not total generation time
+    llm_write_timeout: float = 10.0  # seconds
+    llm_pool_timeout: float = 5.0  # seconds waiting for a free connection
+    llm_max_retries: int = 0  # 429s and errors are handled by the router and limiter
     
     # Langfuse
     langfuse_public_key: Optional[str] = None
@@ -29,17 +94,79 @@ class Settings(BaseSettings):
     whatsapp_verify_token: Optional[str] = None
     
     # Application
+    admin_api_key: Optional[str] = None  # required in X-Admin-Key when set
     debug: bool = False
     log_level: str = "INFO"
     
     # RAG Settings
-    max_context_length: int = 4000
+    max_context_length: int = 4000  # token budget for KB passages plus history
+    context_history_share: float = 0.3  # budget reserved for history turns
+    context_dedup_threshold: float = 0.85  # shingle Jaccard above which passages are duplicates
+    context_max_history_turns: int = 10
     similarity_threshold: float = 0.7
     max_retrieved_docs: int = 5
+    semantic_search_timeout: float = 1.5  # seconds; slower legs are dropped
+    lexical_search_timeout: float = 1.0  # seconds; slower legs are dropped
+    lexical_backend: str = "postgres"  # "postgres" (full-text) or "bm25" (in-process)
+    bm25_k1: float = 1.2
+    bm25_b: float = 0.75
+    bm25_refresh_interval: int = 30  # seconds between KB version checks
+    vector_search_backend: str = "qdrant"  # "qdrant" or "local" (in-process NumPy)
+    local_vector_snapshot_dir: str = "/tmp/chatbot-vector-index"
+    local_vector_quantization: str = "none"  # "none" (float32) or "int8"
+    local_vector_refresh_interval: int = 30  # seconds between KB version checks
+    
+    # Fast path: answer top FAQ hits from the knowledge base without the LLM
+    fast_path_enabled: bool = False
+    fast_path_min_score: float = 0.9  # semantic similarity the top hit must reach
+    fast_path_categories: str = "faq"  # comma-separated categories eligible for direct answers
+    fast_path_variables_ttl: int = 60  # seconds variables are cached in-process
+    
+    # Embedding Settings
+    embedding_backend: str = "local"  # "local" (CPU MiniLM) or "openai"
+    local_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_batch_window_ms: float = 3.0  # micro-batch gathering window
+    embedding_max_batch_size: int = 64
+    embedding_model: str = "text-embedding-3-small"
+    embedding_dimension: int = 384  # Qdrant vector size; OpenAI embeddings are requested at this size
+    embedding_cache_size: int = 10000  # in-process LRU entries
+    embedding_cache_ttl: int = 604800  # 7 days in Redis
+    
+    # Indexing Settings
+    indexing_batch_size: int = 64  # rows embedded per call
+    qdrant_upsert_batch_size: int = 256  # points per upsert/delete request
+    kb_chunk_tokens: int = 200  # target tokens per indexed chunk
+    kb_chunk_overlap_tokens: int = 40  # tokens repeated between neighbouring chunks
+    reindex_batch_delay_ms: int = 200  # pause between batches during a rebuild
+    reindex_lock_ttl: int = 600  # seconds; refreshed while a rebuild makes progress
+    
+    # Response Cache Settings
+    response_cache_enabled: bool = True
+    response_cache_collection: str = "response_cache"
+    response_cache_max_distance: float = 0.08  # cosine distance for a cache hit
+    response_cache_ttl: int = 3600  # seconds
     
     # Session Settings
     session_ttl: int = 86400  # 24 hours
     max_session_messages: int = 20
+    session_codec: str = "msgpack"  # msgpack, orjson or json; falls back to json if not installed
+    session_compression: str = "none"  # none, zstd or lz4
+    session_compression_threshold: int = 512  # bytes; smaller messages are stored uncompressed
+    session_cache_enabled: bool = False  # in-process near-cache in front of Redis sessions
+    session_cache_max_entries: int = 5000
+    session_cache_ttl: float = 30.0  # seconds; bounds staleness if an invalidation is missed
+    session_cache_channel: str = "session:invalidate"  # pub/sub channel shared by all workers
+    session_persist_enabled: bool = False  # write-behind copy of sessions in PostgreSQL
+    session_persist_interval: float = 5.0  # seconds between flushes
+    session_persist_batch_size: int = 200  # sessions per multi-row upsert; a full batch flushes early
+    session_persist_max_pending: int = 10000  # oldest dirty sessions are dropped beyond this
+    
+    # Rolling conversation summaries
+    summary_enabled: bool = True
+    summary_keep_recent_messages: int = 6  # newest messages always kept verbatim
+    summary_batch_messages: int = 6  # older messages that accumulate before a summary pass
+    summary_max_tokens: int = 300
+    summary_lock_ttl: int = 60  # seconds
     
     class Config:
         env_file = ".env"
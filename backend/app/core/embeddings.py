@@ -0,0 +1,164 @@
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+import structlog
+from prometheus_client import Histogram
+
+from app.core.config import settings
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency, only needed for the local backend
+    SentenceTransformer = None
+
+logger = structlog.get_logger()
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "chatbot_local_embedding_batch_size",
+    "Number of texts embedded per local forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+EMBEDDING_BATCH_SECONDS = Histogram(
+    "chatbot_local_embedding_batch_seconds",
+    "Time spent in one local embedding forward pass"
+)
+
+class MicroBatcher:
+    """Gathers concurrent embed calls into a single forward pass"""
+
+    def __init__(self, encode, window_ms: float, max_batch_size: int):
+        self.encode = encode
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, text: str) -> List[float]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.window
+
+            # Collect more requests until the window closes or the batch is full
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            batch = [(text, future) for text, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            try:
+                vectors = await self.encode([text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                logger.error("Local embedding batch failed", error=str(e), batch_size=len(batch))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+class LocalEmbedder:
+    """CPU sentence-transformers model, loaded once per process"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        # A single worker keeps forward passes serialized and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._model = None
+        self._batcher = MicroBatcher(
+            self.embed_many,
+            window_ms=settings.embedding_batch_window_ms,
+            max_batch_size=settings.embedding_max_batch_size
+        )
+
+    async def load(self):
+        loop = asyncio.get_running_loop()
+        self._model = await loop.run_in_executor(
+            self._executor,
+            lambda: SentenceTransformer(self.model_name, device="cpu")
+        )
+        self._batcher.start()
+
+    async def close(self):
+        await self._batcher.stop()
+        self._executor.shutdown(wait=False)
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text, batched with concurrent callers"""
+        return await self._batcher.submit(text)
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed a list of texts in one forward pass"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        vectors = await loop.run_in_executor(self._executor, self._encode, texts)
+        EMBEDDING_BATCH_SIZE.observe(len(texts))
+        EMBEDDING_BATCH_SECONDS.observe(time.perf_counter() - start)
+        return vectors
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.encode(
+            texts,
+            batch_size=settings.embedding_max_batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+
+# Global local embedder (None when the local backend is disabled)
+local_embedder: LocalEmbedder = None
+
+async def init_embeddings():
+    """Load the local embedding model when the local backend is enabled"""
+    global local_embedder
+    if settings.embedding_backend != "local":
+        return
+
+    if SentenceTransformer is None:
+        # Falling back to another model would write vectors of a different size
+        raise RuntimeError("embedding_backend is 'local' but sentence-transformers is not installed")
+
+    try:
+        local_embedder = LocalEmbedder(settings.local_embedding_model)
+        await local_embedder.load()
+        logger.info("Local embedding model loaded", model=settings.local_embedding_model)
+    except Exception as e:
+        local_embedder = None
+        logger.error("Failed to load local embedding model", error=str(e))
+        raise
+
+async def close_embeddings():
+    """Stop the micro-batcher and release the model"""
+    global local_embedder
+    if local_embedder is not None:
+        await local_embedder.close()
+        local_embedder = None
+
+def get_local_embedder() -> Optional[LocalEmbedder]:
+    """Get the local embedder, or None if it is not loaded"""
+    return local_embedder
@@ -0,0 +1,79 @@
+from typing import Dict, Optional
+import httpx
+import openai
+from app.core.config import settings
+import structlog
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = structlog.get_logger()
+
+# Shared connection pool and per-provider clients, owned by the application lifespan
+http_client: httpx.AsyncClient = None
+llm_clients: Dict[str, openai.AsyncOpenAI] = {}
+llm_models: Dict[str, str] = {}
+
+def _build_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.llm_http2 and HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.llm_connect_timeout,
+            read=settings.llm_read_timeout,
+            write=settings.llm_write_timeout,
+            pool=settings.llm_pool_timeout
+        )
+    )
+
+async def init_llm():
+    """Initialize the pooled HTTP client and LLM provider clients"""
+    global http_client
+    http_client = _build_http_client()
+
+    if settings.deepseek_api_key:
+        llm_clients["deepseek"] = openai.AsyncOpenAI(
+            api_key=settings.deepseek_api_key,
+            base_url=settings.deepseek_base_url,
+            http_client=http_client,
+            max_retries=settings.llm_max_retries
+        )
+        llm_models["deepseek"] = settings.deepseek_model
+
+    if settings.openai_api_key:
+        llm_clients["openai"] = openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=http_client,
+            max_retries=settings.llm_max_retries
+        )
+        llm_models["openai"] = settings.openai_model
+
+    logger.info(
+        "LLM clients initialized",
+        providers=sorted(llm_clients),
+        http2=settings.llm_http2 and HTTP2_AVAILABLE
+    )
+
+async def close_llm():
+    """Close provider clients and the shared connection pool"""
+    global http_client
+    llm_clients.clear()
+    llm_models.clear()
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+def get_llm_client(provider: str = "openai") -> Optional[openai.AsyncOpenAI]:
+    """Get the client for a provider, or None if it isn't configured"""
+    return llm_clients.get(provider)
+
+def get_llm_model(provider: str) -> Optional[str]:
+    """Chat model configured for a provider"""
+    return llm_models.get(provider)
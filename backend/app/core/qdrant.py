@@ -1,43 +1,198 @@
-from qdrant_client import QdrantClient
+from typing import Dict, Optional
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from app.core.config import settings
 import structlog
 
 logger = structlog.get_logger()
 
-# Global Qdrant client
-qdrant_client: QdrantClient = None
+# Global Qdrant client (async, owned by the application lifespan)
+qdrant_client: AsyncQdrantClient = None
+
+# Payload fields that searches and index maintenance filter on, per collection
+KB_PAYLOAD_INDEXES = {
+    "id": models.PayloadSchemaType.KEYWORD,
+    "language": models.PayloadSchemaType.KEYWORD,
+    "status": models.PayloadSchemaType.KEYWORD
+}
+RESPONSE_CACHE_PAYLOAD_INDEXES = {
+    "language": models.PayloadSchemaType.KEYWORD,
+    "kb_version": models.PayloadSchemaType.INTEGER,
+    "expires_at": models.PayloadSchemaType.FLOAT
+}
 
 async def init_qdrant():
     """Initialize Qdrant connection and collections"""
     global qdrant_client
     try:
-        qdrant_client = QdrantClient(url=settings.qdrant_url)
-        
+        qdrant_client = AsyncQdrantClient(
+            url=settings.qdrant_url,
+            timeout=settings.qdrant_timeout
+        )
+
         # Test connection
-        collections = qdrant_client.get_collections()
+        collections = await qdrant_client.get_collections()
         logger.info("Qdrant connection established")
-        
-        # Create knowledge base collection if it doesn't exist
-        try:
-            qdrant_client.get_collection(settings.qdrant_collection)
-            logger.info(f"Collection {settings.qdrant_collection} already exists")
-        except Exception:
-            # Create collection with 384-dimensional vectors (sentence-transformers/all-MiniLM-L6-v2)
-            qdrant_client.create_collection(
-                collection_name=settings.qdrant_collection,
-                vectors_config=models.VectorParams(
-                    size=384,
-                    distance=models.Distance.COSINE
-                )
-            )
-            logger.info(f"Created collection {settings.qdrant_collection}")
-            
+
+        # Create or migrate the knowledge base collection behind its alias
+        await _init_kb_collection()
+
+        # Collection backing the semantic response cache
+        if settings.response_cache_enabled:
+            await provision_collection(settings.response_cache_collection, RESPONSE_CACHE_PAYLOAD_INDEXES)
+
     except Exception as e:
         logger.error("Failed to connect to Qdrant", error=str(e))
         raise
 
-def get_qdrant() -> QdrantClient:
+async def _init_kb_collection():
+    """Resolve the versioned collection behind settings.qdrant_collection"""
+    alias = settings.qdrant_collection
+    target = await resolve_alias(alias)
+
+    if target is None:
+        try:
+            await qdrant_client.get_collection(alias)
+            # Legacy deployment: a plain collection still carries the alias name
+            # until the first reindex replaces it with a versioned one
+            logger.info(f"Collection {alias} is not versioned yet")
+            target = alias
+        except Exception:
+            target = versioned_collection_name(alias, 1)
+            await provision_collection(target, KB_PAYLOAD_INDEXES)
+            await qdrant_client.update_collection_aliases(
+                change_aliases_operations=[
+                    models.CreateAliasOperation(
+                        create_alias=models.CreateAlias(collection_name=target, alias_name=alias)
+                    )
+                ]
+            )
+            logger.info(f"Created alias {alias} -> {target}")
+            return
+
+    await provision_collection(target, KB_PAYLOAD_INDEXES)
+
+def versioned_collection_name(alias: str, version: int) -> str:
+    return f"{alias}_v{version}"
+
+async def resolve_alias(alias: str) -> Optional[str]:
+    """Collection an alias points to, or None if the alias doesn't exist"""
+    response = await qdrant_client.get_aliases()
+    for description in response.aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+def _hnsw_config() -> models.HnswConfigDiff:
+    return models.HnswConfigDiff(
+        m=settings.qdrant_hnsw_m,
+        ef_construct=settings.qdrant_hnsw_ef_construct,
+        on_disk=settings.qdrant_hnsw_on_disk
+    )
+
+def _quantization_config() -> Optional[models.ScalarQuantization]:
+    if settings.qdrant_quantization != "int8":
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=settings.qdrant_quantization_quantile,
+            always_ram=settings.qdrant_quantization_always_ram
+        )
+    )
+
+def search_params() -> models.SearchParams:
+    """Search-time HNSW and quantization parameters"""
+    quantization = None
+    if settings.qdrant_quantization == "int8":
+        quantization = models.QuantizationSearchParams(
+            rescore=settings.qdrant_quantization_rescore,
+            oversampling=settings.qdrant_quantization_oversampling
+        )
+    return models.SearchParams(
+        hnsw_ef=settings.qdrant_search_hnsw_ef,
+        quantization=quantization
+    )
+
+async def provision_collection(collection_name: str, payload_indexes: Dict[str, models.PayloadSchemaType]):
+    """Create a collection with the configured tuning, or migrate an existing one in place"""
+    try:
+        info = await qdrant_client.get_collection(collection_name)
+    except Exception:
+        info = None
+
+    if info is None:
+        # 384-dimensional vectors by default (sentence-transformers/all-MiniLM-L6-v2)
+        await qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(
+                size=settings.embedding_dimension,
+                distance=models.Distance.COSINE,
+                on_disk=settings.qdrant_on_disk_vectors
+            ),
+            hnsw_config=_hnsw_config(),
+            quantization_config=_quantization_config()
+        )
+        logger.info(f"Created collection {collection_name}")
+    else:
+        logger.info(f"Collection {collection_name} already exists")
+        await _migrate_collection(collection_name, info)
+
+    await _ensure_payload_indexes(collection_name, info, payload_indexes)
+
+async def _migrate_collection(collection_name: str, info: models.CollectionInfo):
+    """Apply changed HNSW, quantization and on-disk settings without recreating"""
+    config = info.config
+    changes = {}
+
+    hnsw = config.hnsw_config
+    if (
+        hnsw.m != settings.qdrant_hnsw_m
+        or hnsw.ef_construct != settings.qdrant_hnsw_ef_construct
+        or bool(hnsw.on_disk) != settings.qdrant_hnsw_on_disk
+    ):
+        changes["hnsw_config"] = _hnsw_config()
+
+    quantization = _quantization_config()
+    if quantization is not None and config.quantization_config != quantization:
+        changes["quantization_config"] = quantization
+    elif quantization is None and config.quantization_config is not None:
+        changes["quantization_config"] = models.Disabled.DISABLED
+
+    vectors = config.params.vectors
+    if isinstance(vectors, models.VectorParams) and bool(vectors.on_disk) != settings.qdrant_on_disk_vectors:
+        # The unnamed default vector is addressed by the empty name
+        changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=settings.qdrant_on_disk_vectors)}
+
+    if changes:
+        await qdrant_client.update_collection(collection_name=collection_name, **changes)
+        logger.info(f"Migrated collection {collection_name}", changes=sorted(changes))
+
+async def _ensure_payload_indexes(
+    collection_name: str,
+    info: Optional[models.CollectionInfo],
+    payload_indexes: Dict[str, models.PayloadSchemaType]
+):
+    existing = info.payload_schema if info else {}
+    for field_name, field_schema in payload_indexes.items():
+        if field_name in existing:
+            continue
+        await qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema
+        )
+        logger.info(f"Created payload index {collection_name}.{field_name}")
+
+async def close_qdrant():
+    """Close Qdrant connection"""
+    global qdrant_client
+    if qdrant_client is not None:
+        await qdrant_client.close()
+        qdrant_client = None
+        logger.info("Qdrant connection closed")
+
+def get_qdrant() -> AsyncQdrantClient:
     """Get Qdrant client"""
     if qdrant_client is None:
         raise RuntimeError("Qdrant not initialized")
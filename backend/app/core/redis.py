@@ -6,16 +6,19 @@ logger = structlog.get_logger()
 
 # Global Redis connection
 redis_client: redis.Redis = None
+# Same server without response decoding, for binary-encoded values
+redis_bytes_client: redis.Redis = None
 
 async def init_redis():
     """Initialize Redis connection"""
-    global redis_client
+    global redis_client, redis_bytes_client
     try:
         redis_client = redis.from_url(
             settings.redis_url,
             encoding="utf-8",
             decode_responses=True
         )
+        redis_bytes_client = redis.from_url(settings.redis_url, decode_responses=False)
         # Test connection
         await redis_client.ping()
         logger.info("Redis connection established")
@@ -28,3 +31,7 @@ async def get_redis() -> redis.Redis:
     if redis_client is None:
         await init_redis()
     return redis_client
+
+def get_redis_bytes() -> redis.Redis:
+    """Get the Redis client that returns raw bytes"""
+    return redis_bytes_client
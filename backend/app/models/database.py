@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, JSON, Numeric
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -10,12 +10,13 @@ class KBEntry(Base):
     language = Column(String(10), default="en")
     canonical_answer = Column(Text)
     follow_up_suggestions = Column(Text)
+    token_count = Column(Integer)
     last_updated = Column(DateTime, default=func.now())
     status = Column(String(20), default="active")
     created_at = Column(DateTime, default=func.now())
 
 class Variable(Base):
-    __tablename__ = "variables"
+    __tablename__ = "chatbot_variables"
     
     key = Column(String(255), primary_key=True)
     value = Column(Text)
@@ -30,7 +31,10 @@ class Message(Base):
     message_text = Column(Text)
     response_text = Column(Text)
     timestamp = Column(DateTime, default=func.now())
-    model_cost_cents = Column(Integer, default=0)
+    model_cost_cents = Column(Numeric(12, 4), default=0)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    embedding_tokens = Column(Integer, default=0)
     response_ms = Column(Integer, default=0)
     confidence_score = Column(Float)
     session_id = Column(String(255))
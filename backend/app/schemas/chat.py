@@ -20,6 +20,8 @@ class ChatResponse(BaseModel):
     confidence_score: Optional[float] = None
     suggested_actions: Optional[List[str]] = None
     processing_time_ms: int
+    response_source: str = "llm"  # "llm", "semantic_cache" or "fast_path"
+    first_token_ms: Optional[int] = None  # set for streamed responses
 
 class SessionData(BaseModel):
     user_id: str
@@ -27,9 +29,23 @@ class SessionData(BaseModel):
     language: str
     last_active: datetime
     metadata: Optional[Dict[str, Any]] = None
+    summary: Optional[str] = None  # rolling summary of turns compacted out of messages
 
 class RAGContext(BaseModel):
     query: str
     retrieved_docs: List[Dict[str, Any]]
     context_text: str
     confidence_score: float
+    context_tokens: int = 0
+
+class CachedResponse(BaseModel):
+    response: str
+    suggested_actions: Optional[List[str]] = None
+    confidence_score: Optional[float] = None
+    similarity: float
+
+class FastPathAnswer(BaseModel):
+    entry_id: str
+    response: str
+    suggested_actions: Optional[List[str]] = None
+    confidence_score: float
@@ -37,7 +37,7 @@ class VariableResponse(BaseModel):
     updated_at: datetime
 
 class SyncRequest(BaseModel):
-    source: str  # "google_sheets"
+    source: str  # "google_sheets" or "database"
     force_update: bool = False
 
 class SyncResponse(BaseModel):
@@ -45,3 +45,17 @@ class SyncResponse(BaseModel):
     entries_processed: int
     errors: List[str] = []
     message: str
+
+class IndexingStats(BaseModel):
+    indexed: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+class ReindexStatus(BaseModel):
+    state: str  # "idle", "running", "swapping", "completed" or "failed"
+    collection: Optional[str] = None
+    previous: Optional[str] = None
+    indexed: int = 0
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
@@ -0,0 +1,215 @@
+from typing import Dict, List, Optional, Tuple
+from array import array
+from collections import Counter
+import asyncio
+import heapq
+import math
+import re
+import structlog
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis
+from app.models.database import KBEntry
+from app.services.kb_version import get_kb_version
+
+logger = structlog.get_logger()
+
+_token_pattern = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    return _token_pattern.findall(text.lower())
+
+class _Partition:
+    """BM25 postings for one language, stored in compact arrays"""
+
+    def __init__(self):
+        self.docs: List[Optional[Dict]] = []  # slot -> document, None once removed
+        self.doc_lengths = array("I")
+        self.postings: Dict[str, Tuple[array, array]] = {}  # term -> (slots, term frequencies)
+        self.slot_of: Dict[str, int] = {}
+        self.total_length = 0
+        self.tombstones = 0
+
+    @property
+    def live_docs(self) -> int:
+        return len(self.slot_of)
+
+    def add(self, doc: Dict):
+        tokens = tokenize(f"{doc['category']} {doc['content']}")
+        slot = len(self.docs)
+        self.docs.append(doc)
+        self.doc_lengths.append(len(tokens))
+        self.slot_of[doc["id"]] = slot
+        self.total_length += len(tokens)
+
+        for term, tf in Counter(tokens).items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("I"), array("H"))
+            postings[0].append(slot)
+            postings[1].append(min(tf, 65535))
+
+    def remove(self, doc_id: str):
+        slot = self.slot_of.pop(doc_id, None)
+        if slot is None:
+            return
+        self.docs[slot] = None
+        self.total_length -= self.doc_lengths[slot]
+        self.tombstones += 1
+
+    def needs_compaction(self) -> bool:
+        return self.tombstones > 64 and self.tombstones > self.live_docs // 4
+
+    def search(self, terms: List[str], limit: int, k1: float, b: float) -> List[Tuple[float, Dict]]:
+        live_docs = self.live_docs
+        if not live_docs:
+            return []
+
+        avg_length = self.total_length / live_docs
+        scores: Dict[int, float] = {}
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            slots, frequencies = postings
+            # Document frequency counts removed slots until the next compaction
+            df = len(slots)
+            idf = math.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+            for slot, tf in zip(slots, frequencies):
+                if self.docs[slot] is None:
+                    continue
+                norm = k1 * (1 - b + b * self.doc_lengths[slot] / avg_length)
+                scores[slot] = scores.get(slot, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(score, self.docs[slot]) for slot, score in top]
+
+class BM25Index:
+    """In-process BM25 index over active kb_entries, partitioned by language"""
+
+    def __init__(self, k1: float, b: float):
+        self.k1 = k1
+        self.b = b
+        self.version: Optional[int] = None
+        self._partitions: Dict[str, _Partition] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.version is not None
+
+    def build(self, entries: List[KBEntry], version: int):
+        """Replace the whole index with the given entries"""
+        partitions: Dict[str, _Partition] = {}
+        for entry in entries:
+            if entry.status != "active":
+                continue
+            partitions.setdefault(entry.language, _Partition()).add(self._document(entry))
+        self._partitions = partitions
+        self.version = version
+
+    def apply(self, entry: KBEntry):
+        """Incrementally reflect a created/updated entry"""
+        if not self.ready:
+            return
+
+        for partition in self._partitions.values():
+            partition.remove(entry.id)
+
+        if entry.status == "active":
+            self._partitions.setdefault(entry.language, _Partition()).add(self._document(entry))
+
+        for language, partition in list(self._partitions.items()):
+            if partition.needs_compaction():
+                self._partitions[language] = self._compact(partition)
+
+    def mark_version(self, version: int):
+        """Adopt a version bumped by this worker if no other change slipped in"""
+        if self.version is not None and self.version == version - 1:
+            self.version = version
+
+    def search(self, query: str, language: str, limit: int) -> List[Dict]:
+        partition = self._partitions.get(language)
+        if partition is None:
+            return []
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        results = []
+        for score, doc in partition.search(terms, limit, self.k1, self.b):
+            results.append({
+                "id": doc["id"],
+                "content": doc["content"],
+                "category": doc["category"],
+                # Squash unbounded BM25 scores into 0..1
+                "score": score / (score + 1.0),
+                "follow_up_suggestions": doc["follow_up_suggestions"],
+                "token_count": doc["token_count"],
+                "source": "lexical"
+            })
+        return results
+
+    def _compact(self, partition: _Partition) -> _Partition:
+        compacted = _Partition()
+        for doc in partition.docs:
+            if doc is not None:
+                compacted.add(doc)
+        return compacted
+
+    def _document(self, entry: KBEntry) -> Dict:
+        return {
+            "id": entry.id,
+            "content": entry.canonical_answer or "",
+            "category": entry.category or "",
+            "follow_up_suggestions": entry.follow_up_suggestions or "",
+            "token_count": entry.token_count
+        }
+
+    async def rebuild(self):
+        """Rebuild from PostgreSQL, tagged with the current KB version"""
+        redis = await get_redis()
+        version = await get_kb_version(redis)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(KBEntry).where(KBEntry.status == "active"))
+            entries = result.scalars().all()
+        self.build(entries, version)
+        logger.info("BM25 index built", entries=len(entries), version=version)
+
+    async def _refresh_loop(self):
+        """Pick up KB changes made by other workers"""
+        while True:
+            await asyncio.sleep(settings.bm25_refresh_interval)
+            try:
+                redis = await get_redis()
+                if await get_kb_version(redis) != self.version:
+                    await self.rebuild()
+            except Exception as e:
+                logger.error("BM25 index refresh failed", error=str(e))
+
+    def start_refresh(self):
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+# Process-wide index, populated at startup when the bm25 lexical backend is enabled
+bm25_index = BM25Index(k1=settings.bm25_k1, b=settings.bm25_b)
+
+async def init_bm25_index():
+    """Build the BM25 index when it is the configured lexical backend"""
+    if settings.lexical_backend != "bm25":
+        return
+    await bm25_index.rebuild()
+    bm25_index.start_refresh()
+
+async def close_bm25_index():
+    await bm25_index.stop_refresh()
@@ -1,90 +1,227 @@
-from typing import Optional, List
+from typing import Optional, List, Any, AsyncIterator, Tuple
 from datetime import datetime
 import json
 import uuid
 import structlog
+from prometheus_client import Histogram
 
 from app.core.config import settings
-from app.core.redis import get_redis
-from app.schemas.chat import ChatRequest, ChatResponse, ChatMessage, SessionData
+from app.core.redis import get_redis, get_redis_bytes
+from app.core.background import spawn
+from app.schemas.chat import ChatRequest, ChatResponse, ChatMessage, SessionData, RAGContext
 from app.services.rag_service import RAGService
 from app.services.llm_service import LLMService
-from app.services.session_service import SessionService
+from app.services.session_service import SessionService, SessionTurn
+from app.services.response_cache import ResponseCache
+from app.services.summarizer import ConversationSummarizer
+from app.services.fast_path import FastPathService
+from app.services.usage import UsageTracker, track_usage
+from app.services.llm_limiter import priority_for_channel, set_request_priority
 
 logger = structlog.get_logger()
 
+FIRST_TOKEN_SECONDS = Histogram(
+    "chatbot_first_token_seconds",
+    "Time from request start to the first response token",
+    ["source"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+)
+
+class _ChatTurn:
+    """State carried between the stages of one chat turn"""
+
+    def __init__(self, request: ChatRequest):
+        self.start_time = datetime.now()
+        self.session_id = request.session_id or str(uuid.uuid4())
+        self.session: Optional[SessionTurn] = None
+        self.language = request.language or "en"
+        self.conversation_context: List[ChatMessage] = []
+        self.summary: Optional[str] = None
+        self.query_embedding: List[float] = []
+        self.rag_context: Optional[RAGContext] = None
+        self.response_text: Optional[str] = None
+        self.suggested_actions: Optional[List[str]] = None
+        self.confidence_score: Optional[float] = None
+        self.response_source = "llm"
+        self.first_token_at: Optional[datetime] = None
+        self.usage: Optional[UsageTracker] = None
+
+    @property
+    def standalone(self) -> bool:
+        """No earlier turns or summary shaped the answer, so it can be shared across users"""
+        return not self.summary and len(self.conversation_context) <= 1
+
 class ChatService:
     def __init__(self, db, redis):
         self.db = db
         self.redis = redis
         self.rag_service = RAGService(db, redis)
-        self.llm_service = LLMService()
-        self.session_service = SessionService(redis)
+        self.llm_service = LLMService(redis)
+        self.session_service = SessionService(get_redis_bytes())
+        self.response_cache = ResponseCache(redis)
+        self.summarizer = ConversationSummarizer(redis)
+        self.fast_path = FastPathService(db, redis)
 
     async def process_message(self, request: ChatRequest) -> ChatResponse:
         """Process a chat message and return response"""
-        start_time = datetime.now()
-        
         try:
-            # Get or create session
-            session_id = request.session_id or str(uuid.uuid4())
-            session_data = await self.session_service.get_session(request.user_id)
+            turn = await self._prepare_turn(request)
             
-            # Add user message to session
-            user_message = ChatMessage(
-                role="user",
-                content=request.message,
-                timestamp=datetime.now()
-            )
-            await self.session_service.add_message(request.user_id, user_message)
+            if turn.response_text is None:
+                # Generate response using LLM
+                turn.response_text = await self.llm_service.generate_response(
+                    user_message=request.message,
+                    conversation_context=turn.conversation_context,
+                    rag_context=turn.rag_context,
+                    language=turn.language,
+                    summary=turn.summary
+                )
             
-            # Get conversation context
-            conversation_context = await self.session_service.get_conversation_context(
-                request.user_id, 
-                max_messages=settings.max_session_messages
-            )
+            return await self._finish_turn(request, turn)
             
-            # Perform RAG retrieval
-            rag_context = await self.rag_service.retrieve_context(
-                query=request.message,
-                language=request.language or "en"
-            )
-            
-            # Generate response using LLM
-            response_text = await self.llm_service.generate_response(
-                user_message=request.message,
-                conversation_context=conversation_context,
-                rag_context=rag_context,
-                language=request.language or "en"
-            )
-            
-            # Add assistant response to session
-            assistant_message = ChatMessage(
-                role="assistant",
-                content=response_text,
-                timestamp=datetime.now()
-            )
-            await self.session_service.add_message(request.user_id, assistant_message)
-            
-            # Calculate processing time
-            processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
+        except Exception as e:
+            logger.error("Chat processing failed", error=str(e), user_id=request.user_id)
+            raise
+
+    async def stream_message(self, request: ChatRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """Process a chat message, yielding ("token", text) events and a final ("done", ChatResponse)"""
+        try:
+            turn = await self._prepare_turn(request)
             
-            # Log message to database if available
-            if self.db:
-                await self._log_message(request, response_text, processing_time, rag_context.confidence_score)
+            if turn.response_text is not None:
+                turn.first_token_at = datetime.now()
+                yield "token", turn.response_text
+            else:
+                parts = []
+                async for delta in self.llm_service.stream_response(
+                    user_message=request.message,
+                    conversation_context=turn.conversation_context,
+                    rag_context=turn.rag_context,
+                    language=turn.language,
+                    summary=turn.summary
+                ):
+                    if turn.first_token_at is None:
+                        turn.first_token_at = datetime.now()
+                    parts.append(delta)
+                    yield "token", delta
+                turn.response_text = "".join(parts)
             
-            return ChatResponse(
-                response=response_text,
-                session_id=session_id,
-                confidence_score=rag_context.confidence_score,
-                suggested_actions=rag_context.retrieved_docs[0].get("follow_up_suggestions", "").split(";") if rag_context.retrieved_docs else None,
-                processing_time_ms=processing_time
-            )
+            # Session write and message log happen once the full reply is known
+            yield "done", await self._finish_turn(request, turn)
             
         except Exception as e:
-            logger.error("Chat processing failed", error=str(e), user_id=request.user_id)
+            logger.error("Chat streaming failed", error=str(e), user_id=request.user_id)
             raise
 
+    async def _prepare_turn(self, request: ChatRequest) -> "_ChatTurn":
+        """Record the user message and resolve a cached answer or retrieval context"""
+        turn = _ChatTurn(request)
+        
+        # Attribute every model call made for this message to it, queued by channel priority
+        turn.usage = track_usage(request.channel)
+        set_request_priority(priority_for_channel(request.channel))
+        
+        # Load the session once; the turn is written back in one call at the end
+        turn.session = await self.session_service.begin_turn(request.user_id)
+        turn.session.add(ChatMessage(
+            role="user",
+            content=request.message,
+            timestamp=datetime.now()
+        ))
+        
+        # Conversation context and the summary of older turns come from the in-memory view
+        turn.conversation_context = turn.session.messages
+        turn.summary = turn.session.summary
+        
+        # Embed once; reused by the response cache and semantic retrieval
+        turn.query_embedding = await self.rag_service.embed_query(request.message)
+        
+        # Follow-ups depend on this user's history, so only first messages use the cache
+        cached = None
+        if settings.response_cache_enabled and turn.standalone:
+            cached = await self.response_cache.lookup(turn.query_embedding, turn.language)
+        
+        if cached:
+            turn.response_text = cached.response
+            turn.suggested_actions = cached.suggested_actions
+            turn.confidence_score = cached.confidence_score
+            turn.response_source = "semantic_cache"
+            return turn
+        
+        # Perform RAG retrieval
+        turn.rag_context = await self.rag_service.retrieve_context(
+            query=request.message,
+            language=turn.language,
+            embedding=turn.query_embedding
+        )
+        
+        # Common questions with a confident FAQ hit are answered verbatim, without the LLM
+        fast_answer = await self.fast_path.answer(turn.rag_context)
+        if fast_answer:
+            turn.response_text = fast_answer.response
+            turn.suggested_actions = fast_answer.suggested_actions
+            turn.confidence_score = fast_answer.confidence_score
+            turn.response_source = "fast_path"
+            return turn
+        
+        turn.suggested_actions = turn.rag_context.retrieved_docs[0].get("follow_up_suggestions", "").split(";") if turn.rag_context.retrieved_docs else None
+        turn.confidence_score = turn.rag_context.confidence_score
+        return turn
+
+    async def _finish_turn(self, request: ChatRequest, turn: "_ChatTurn") -> ChatResponse:
+        """Cache, store and log a completed turn"""
+        # Only cache answers grounded in the knowledge base and not in this user's history
+        if (
+            settings.response_cache_enabled
+            and turn.standalone
+            and turn.response_source == "llm"
+            and turn.rag_context.retrieved_docs
+            and not self.llm_service.last_failed
+        ):
+            await self.response_cache.store(
+                turn.query_embedding,
+                turn.language,
+                request.message,
+                turn.response_text,
+                turn.suggested_actions,
+                turn.confidence_score
+            )
+        
+        # Write the user and assistant messages together
+        turn.session.add(ChatMessage(
+            role="assistant",
+            content=turn.response_text,
+            timestamp=datetime.now()
+        ))
+        await turn.session.commit()
+        
+        # Compact older turns without holding up the reply
+        spawn(
+            self.summarizer.maybe_summarize(request.user_id, turn.language, turn.session.snapshot()),
+            name="conversation_summary"
+        )
+        
+        # Calculate processing time
+        processing_time = int((datetime.now() - turn.start_time).total_seconds() * 1000)
+        first_token_ms = None
+        if turn.first_token_at is not None:
+            first_token_ms = int((turn.first_token_at - turn.start_time).total_seconds() * 1000)
+            FIRST_TOKEN_SECONDS.labels(source=turn.response_source).observe(first_token_ms / 1000)
+        
+        # Log message to database if available
+        if self.db:
+            await self._log_message(request, turn.response_text, processing_time, turn.confidence_score, turn.usage)
+        
+        return ChatResponse(
+            response=turn.response_text,
+            session_id=turn.session_id,
+            confidence_score=turn.confidence_score,
+            suggested_actions=turn.suggested_actions,
+            processing_time_ms=processing_time,
+            response_source=turn.response_source,
+            first_token_ms=first_token_ms
+        )
+
     async def get_session(self, user_id: str) -> Optional[SessionData]:
         """Get user session data"""
         return await self.session_service.get_session(user_id)
@@ -93,7 +230,14 @@ class ChatService:
         """Clear user session data"""
         await self.session_service.clear_session(user_id)
 
-    async def _log_message(self, request: ChatRequest, response: str, processing_time: int, confidence: float):
+    async def _log_message(
+        self,
+        request: ChatRequest,
+        response: str,
+        processing_time: int,
+        confidence: float,
+        usage: UsageTracker
+    ):
         """Log message to database"""
         try:
             from app.models.database import Message
@@ -106,7 +250,11 @@ class ChatService:
                 "response_text": response,
                 "response_ms": processing_time,
                 "confidence_score": confidence,
-                "session_id": request.session_id
+                "session_id": request.session_id,
+                "model_cost_cents": usage.cost_cents,
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "embedding_tokens": usage.embedding_tokens
             }
             
             stmt = insert(Message).values(**message_data)
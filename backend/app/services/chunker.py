@@ -0,0 +1,62 @@
+from typing import List
+import re
+
+from app.services.context_packer import count_tokens
+
+_sentence_boundary = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+def _split_sentences(text: str) -> List[str]:
+    return [part.strip() for part in _sentence_boundary.split(text) if part and part.strip()]
+
+def _split_oversized(sentence: str, chunk_tokens: int) -> List[str]:
+    """Break a single sentence that alone exceeds the chunk size on word boundaries"""
+    pieces, current = [], []
+    for word in sentence.split():
+        current.append(word)
+        if count_tokens(" ".join(current)) >= chunk_tokens:
+            pieces.append(" ".join(current))
+            current = []
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def chunk_text(text: str, chunk_tokens: int, overlap_tokens: int) -> List[str]:
+    """Split text into sentence-aligned chunks of about chunk_tokens with trailing overlap"""
+    if not text:
+        return [""]
+    if count_tokens(text) <= chunk_tokens:
+        return [text]
+
+    sentences = []
+    for sentence in _split_sentences(text):
+        if count_tokens(sentence) > chunk_tokens:
+            sentences.extend(_split_oversized(sentence, chunk_tokens))
+        else:
+            sentences.append(sentence)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if current and current_tokens + tokens > chunk_tokens:
+            chunks.append(" ".join(current))
+
+            # Carry trailing sentences into the next chunk as overlap
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                size = count_tokens(previous)
+                if overlap_size + size > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += size
+            current, current_tokens = overlap, overlap_size
+
+        current.append(sentence)
+        current_tokens += tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Set, Tuple
+import re
+import structlog
+
+from app.core.config import settings
+from app.schemas.chat import ChatMessage
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # optional dependency or offline encoding download
+    _encoding = None
+
+logger = structlog.get_logger()
+
+# Formatting overhead per packed passage ("Context N (category): ") and chat turn
+PASSAGE_OVERHEAD_TOKENS = 8
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_word_pattern = re.compile(r"\w+", re.UNICODE)
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken, or estimate ~4 characters per token"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _word_pattern.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i:i + 3]) for i in range(len(words) - 2)}
+
+def _jaccard(a: Set, b: Set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class ContextPacker:
+    """Fits retrieved passages and history turns into a fixed token budget"""
+
+    def __init__(self, budget: int = None):
+        self.budget = budget if budget is not None else settings.max_context_length
+
+    def pack_documents(self, documents: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Pick the highest-scoring, non-duplicate documents that fit the document share"""
+        doc_budget = self.budget - int(self.budget * settings.context_history_share)
+        packed: List[Dict[str, Any]] = []
+        packed_shingles: List[Set] = []
+        used = 0
+
+        for doc in sorted(documents, key=lambda d: d["score"], reverse=True):
+            shingles = _shingles(doc["content"])
+            if any(_jaccard(shingles, seen) >= settings.context_dedup_threshold for seen in packed_shingles):
+                continue
+
+            tokens = (doc.get("token_count") or count_tokens(doc["content"])) + PASSAGE_OVERHEAD_TOKENS
+            if used + tokens > doc_budget:
+                continue
+
+            packed.append(doc)
+            packed_shingles.append(shingles)
+            used += tokens
+
+        return packed, used
+
+    def pack_history(self, messages: List[ChatMessage], used_tokens: int) -> List[ChatMessage]:
+        """Keep the most recent turns that fit whatever budget the documents left"""
+        remaining = self.budget - used_tokens
+        packed: List[ChatMessage] = []
+
+        for message in reversed(messages[-settings.context_max_history_turns:]):
+            tokens = count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+            if tokens > remaining:
+                break
+            packed.append(message)
+            remaining -= tokens
+
+        packed.reverse()
+        return packed
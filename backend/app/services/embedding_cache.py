@@ -0,0 +1,109 @@
+from typing import List, Optional
+from collections import OrderedDict
+from array import array
+import base64
+import hashlib
+import re
+import unicodedata
+import structlog
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "chatbot_embedding_cache_requests_total",
+    "Embedding cache lookups by tier and result",
+    ["tier", "result"]
+)
+EMBEDDING_CACHE_EVICTIONS = Counter(
+    "chatbot_embedding_cache_evictions_total",
+    "Entries evicted from the in-process embedding cache"
+)
+EMBEDDING_CACHE_SIZE = Gauge(
+    "chatbot_embedding_cache_entries",
+    "Entries currently held in the in-process embedding cache"
+)
+
+_whitespace = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different queries share a cache entry"""
+    text = unicodedata.normalize("NFKC", text)
+    return _whitespace.sub(" ", text).strip().lower()
+
+class EmbeddingCache:
+    """Two-tier embedding cache: bounded in-process LRU in front of Redis"""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def make_key(self, text: str, model: str, dimension: int) -> str:
+        """Build cache key from normalized text, model name and dimension"""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"emb:{model}:{dimension}:{digest}"
+
+    async def get(self, redis, key: str) -> Optional[List[float]]:
+        """Look up an embedding, promoting Redis hits into the local tier"""
+        vector = self._local.get(key)
+        if vector is not None:
+            self._local.move_to_end(key)
+            EMBEDDING_CACHE_REQUESTS.labels(tier="local", result="hit").inc()
+            return list(vector)
+        EMBEDDING_CACHE_REQUESTS.labels(tier="local", result="miss").inc()
+
+        if redis is None:
+            return None
+
+        try:
+            cached = await redis.get(key)
+        except Exception as e:
+            logger.warning("Embedding cache read failed", error=str(e))
+            return None
+
+        if not cached:
+            EMBEDDING_CACHE_REQUESTS.labels(tier="redis", result="miss").inc()
+            return None
+
+        EMBEDDING_CACHE_REQUESTS.labels(tier="redis", result="hit").inc()
+        vector = self._decode(cached)
+        self._put_local(key, vector)
+        return vector
+
+    async def set(self, redis, key: str, vector: List[float]):
+        """Store an embedding in both tiers"""
+        self._put_local(key, vector)
+
+        if redis is None:
+            return
+
+        try:
+            await redis.setex(key, self.ttl, self._encode(vector))
+        except Exception as e:
+            logger.warning("Embedding cache write failed", error=str(e))
+
+    def _put_local(self, key: str, vector: List[float]):
+        self._local[key] = tuple(vector)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            EMBEDDING_CACHE_EVICTIONS.inc()
+        EMBEDDING_CACHE_SIZE.set(len(self._local))
+
+    def _encode(self, vector: List[float]) -> str:
+        # Packed float32 keeps Redis values ~4 bytes per dimension
+        return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+    def _decode(self, value: str) -> List[float]:
+        vector = array("f")
+        vector.frombytes(base64.b64decode(value))
+        return vector.tolist()
+
+# Process-wide cache shared by all request-scoped services
+embedding_cache = EmbeddingCache(
+    max_entries=settings.embedding_cache_size,
+    ttl=settings.embedding_cache_ttl
+)
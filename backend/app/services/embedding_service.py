@@ -0,0 +1,152 @@
+from typing import List
+import hashlib
+import time
+import structlog
+
+from app.core.config import settings
+from app.core.embeddings import get_local_embedder
+from app.core.llm import get_llm_client
+from app.core.qdrant import get_qdrant, resolve_alias
+from app.services.embedding_cache import embedding_cache
+from app.services.single_flight import SingleFlight
+from app.services.context_packer import count_tokens
+from app.services.usage import record_usage
+
+logger = structlog.get_logger()
+
+embedding_flight = SingleFlight("embedding")
+
+class EmbeddingService:
+    def __init__(self, redis):
+        self.redis = redis
+
+    @property
+    def model_name(self) -> str:
+        """Name of the model that currently produces embeddings"""
+        if get_local_embedder() is not None:
+            return settings.local_embedding_model
+        if get_llm_client("openai") is not None:
+            return settings.embedding_model
+        return "md5-fallback"
+
+    async def embed(self, text: str) -> List[float]:
+        """Generate embedding for text, served from the embedding cache when possible"""
+        cache_key = embedding_cache.make_key(
+            text, self.model_name, settings.embedding_dimension
+        )
+        cached = await embedding_cache.get(self.redis, cache_key)
+        if cached is not None:
+            return cached
+
+        # Identical texts arriving together share one model call
+        return await embedding_flight.do(
+            cache_key, lambda: self._embed_uncached(text, cache_key), self.redis
+        )
+
+    async def _embed_uncached(self, text: str, cache_key: str) -> List[float]:
+        try:
+            local_embedder = get_local_embedder()
+            client = get_llm_client("openai")
+            start = time.monotonic()
+            if local_embedder is not None:
+                embedding = await local_embedder.embed(text)
+                record_usage(
+                    "local", settings.local_embedding_model, "embedding",
+                    count_tokens(text), latency=time.monotonic() - start
+                )
+            elif client is not None:
+                response = await client.embeddings.create(
+                    model=settings.embedding_model,
+                    input=text,
+                    dimensions=settings.embedding_dimension
+                )
+                embedding = response.data[0].embedding
+                record_usage(
+                    "openai", settings.embedding_model, "embedding",
+                    response.usage.prompt_tokens, latency=time.monotonic() - start
+                )
+            else:
+                # Fallback to simple text processing
+                return self._simple_embedding(text)
+
+        except Exception as e:
+            logger.error("Embedding generation failed", error=str(e))
+            return self._simple_embedding(text)
+
+        await embedding_cache.set(self.redis, cache_key, embedding)
+        return embedding
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a batch of texts in as few calls as possible"""
+        if not texts:
+            return []
+
+        start = time.monotonic()
+        local_embedder = get_local_embedder()
+        if local_embedder is not None:
+            vectors = await local_embedder.embed_many(texts)
+            record_usage(
+                "local", settings.local_embedding_model, "indexing",
+                sum(count_tokens(text) for text in texts), latency=time.monotonic() - start
+            )
+            return vectors
+
+        client = get_llm_client("openai")
+        if client is not None:
+            response = await client.embeddings.create(
+                model=settings.embedding_model,
+                input=texts,
+                dimensions=settings.embedding_dimension
+            )
+            record_usage(
+                "openai", settings.embedding_model, "indexing",
+                response.usage.prompt_tokens, latency=time.monotonic() - start
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+        return [self._simple_embedding(text) for text in texts]
+
+    def _simple_embedding(self, text: str) -> List[float]:
+        """Simple fallback embedding (not recommended for production)"""
+        # This is a placeholder - in production, use a proper embedding model
+        hash_obj = hashlib.md5(text.encode())
+        hash_bytes = hash_obj.digest()
+        return [float(b) / 255.0 for b in hash_bytes[:16]] + [0.0] * (settings.embedding_dimension - 16)
+
+async def verify_embedding_dimension():
+    """Refuse to start when the active embedding model doesn't fit the Qdrant collections"""
+    local_embedder = get_local_embedder()
+    client = get_llm_client("openai")
+    if settings.embedding_backend == "local" and local_embedder is not None:
+        model = settings.local_embedding_model
+        dimension = len((await local_embedder.embed_many(["dimension probe"]))[0])
+    elif settings.embedding_backend == "openai" and client is not None:
+        model = settings.embedding_model
+        response = await client.embeddings.create(
+            model=model,
+            input="dimension probe",
+            dimensions=settings.embedding_dimension
+        )
+        dimension = len(response.data[0].embedding)
+    else:
+        raise RuntimeError(f"Embedding backend {settings.embedding_backend!r} is not available")
+
+    collections = [settings.qdrant_collection]
+    if settings.response_cache_enabled:
+        collections.append(settings.response_cache_collection)
+    qdrant = get_qdrant()
+    for alias in collections:
+        name = await resolve_alias(alias) or alias
+        info = await qdrant.get_collection(name)
+        size = info.config.params.vectors.size
+        if size != dimension:
+            raise RuntimeError(
+                f"Embedding model {model} produces {dimension}-dim vectors "
+                f"but collection {name} holds {size}-dim vectors"
+            )
+    if dimension != settings.embedding_dimension:
+        raise RuntimeError(
+            f"Embedding model {model} produces {dimension}-dim vectors, "
+            f"embedding_dimension is {settings.embedding_dimension}"
+        )
+    logger.info("Embedding dimension verified", model=model, dimension=dimension)
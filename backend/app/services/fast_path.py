@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional
+import re
+import time
+import structlog
+from prometheus_client import Counter
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.database import KBEntry, Variable
+from app.schemas.chat import FastPathAnswer, RAGContext
+
+logger = structlog.get_logger()
+
+FAST_PATH_DECISIONS = Counter(
+    "chatbot_fast_path_decisions_total",
+    "Fast path decisions by outcome",
+    ["decision"]
+)
+
+# Placeholders in canonical answers, e.g. "Visit {{ store_name }}"
+_placeholder = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Variables change rarely; keep them in-process so the fast path skips a query per reply.
+# Edits bump a version in Redis so every worker reloads, not just the one that made them.
+VARIABLES_VERSION_KEY = "fast_path:variables_version"
+
+_variables: Dict[str, str] = {}
+_variables_loaded_at = 0.0
+_variables_version: Optional[str] = None
+
+async def invalidate_variables(redis=None):
+    """Force the next fast path answer on every worker to reload variables"""
+    global _variables_loaded_at
+    _variables_loaded_at = 0.0
+    if redis is None:
+        return
+    try:
+        await redis.incr(VARIABLES_VERSION_KEY)
+    except Exception as e:
+        logger.error("Failed to publish variables change", error=str(e))
+
+def render_template(text: str, variables: Dict[str, str]) -> str:
+    """Substitute {{ key }} placeholders, leaving unknown keys untouched"""
+    return _placeholder.sub(lambda m: variables.get(m.group(1), m.group(0)), text)
+
+class FastPathService:
+    """Answers high-confidence FAQ hits straight from the knowledge base, skipping the LLM"""
+
+    def __init__(self, db, redis=None):
+        self.db = db
+        self.redis = redis
+        self.categories = {
+            category.strip().lower()
+            for category in settings.fast_path_categories.split(",")
+            if category.strip()
+        }
+
+    async def answer(self, rag_context: RAGContext) -> Optional[FastPathAnswer]:
+        """Return a templated answer if the top hit qualifies, else None"""
+        if not settings.fast_path_enabled:
+            return None
+
+        decision = self._decide(rag_context.retrieved_docs)
+        FAST_PATH_DECISIONS.labels(decision=decision).inc()
+        if decision != "answered":
+            return None
+
+        top = rag_context.retrieved_docs[0]
+        try:
+            canonical_answer = await self._canonical_answer(top)
+            variables = await self._load_variables()
+        except Exception as e:
+            logger.error("Fast path lookup failed", entry_id=top["id"], error=str(e))
+            return None
+
+        suggestions = [
+            render_template(s.strip(), variables)
+            for s in (top.get("follow_up_suggestions") or "").split(";")
+            if s.strip()
+        ]
+        return FastPathAnswer(
+            entry_id=top["id"],
+            response=render_template(canonical_answer, variables),
+            suggested_actions=suggestions or None,
+            confidence_score=top["score"]
+        )
+
+    def _decide(self, docs: List[Dict]) -> str:
+        if not docs:
+            return "no_hits"
+        top = docs[0]
+        # Lexical scores are squashed ranks, not similarities; only trust vector hits
+        if top.get("source") != "semantic" or top["score"] < settings.fast_path_min_score:
+            return "below_threshold"
+        if (top.get("category") or "").lower() not in self.categories:
+            return "ineligible_category"
+        return "answered"
+
+    async def _canonical_answer(self, doc: Dict) -> str:
+        """The whole answer, not just the chunks that matched"""
+        if not self.db:
+            return doc["content"]
+        result = await self.db.execute(
+            select(KBEntry.canonical_answer).where(KBEntry.id == doc["id"])
+        )
+        return result.scalar_one_or_none() or doc["content"]
+
+    async def _load_variables(self) -> Dict[str, str]:
+        global _variables, _variables_loaded_at, _variables_version
+        if not self.db:
+            return _variables
+
+        version = _variables_version
+        if self.redis is not None:
+            try:
+                version = await self.redis.get(VARIABLES_VERSION_KEY)
+            except Exception as e:
+                # Fall back to the TTL alone
+                logger.warning("Failed to read variables version", error=str(e))
+
+        fresh = time.monotonic() - _variables_loaded_at < settings.fast_path_variables_ttl
+        if fresh and version == _variables_version:
+            return _variables
+
+        result = await self.db.execute(select(Variable.key, Variable.value))
+        _variables = {row.key: row.value or "" for row in result}
+        _variables_loaded_at = time.monotonic()
+        _variables_version = version
+        return _variables
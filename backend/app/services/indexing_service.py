@@ -0,0 +1,228 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+import asyncio
+import hashlib
+import uuid
+import structlog
+
+from sqlalchemy import select
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.qdrant import get_qdrant
+from app.models.database import KBEntry
+from app.schemas.knowledge_base import IndexingStats
+from app.services.embedding_service import EmbeddingService
+from app.services.chunker import chunk_text
+from app.services.context_packer import count_tokens
+
+logger = structlog.get_logger()
+
+# Namespace for deterministic Qdrant point ids derived from kb_entries ids
+KB_POINT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "social-media-chatbot/kb_entries")
+
+def point_id(entry_id: str, chunk_index: int) -> str:
+    """Qdrant point id for one chunk of a knowledge base entry"""
+    return str(uuid.uuid5(KB_POINT_NAMESPACE, f"{entry_id}#{chunk_index}"))
+
+def content_hash(entry: KBEntry) -> str:
+    """Hash of every field that ends up in the vectors or their payload"""
+    parts = [
+        entry.category or "",
+        entry.language or "",
+        entry.canonical_answer or "",
+        entry.follow_up_suggestions or "",
+        entry.status or "",
+        # Changing the chunking re-indexes every entry on the next sync
+        f"chunks:{settings.kb_chunk_tokens}:{settings.kb_chunk_overlap_tokens}"
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class IndexingService:
+    """Keeps the Qdrant collection in sync with kb_entries"""
+
+    def __init__(self, db, redis=None, collection_name: str = None):
+        self.db = db
+        self.qdrant = get_qdrant()
+        self.embedding_service = EmbeddingService(redis)
+        self.collection_name = collection_name or settings.qdrant_collection
+
+    async def sync_all(
+        self,
+        force: bool = False,
+        batch_delay: float = 0.0,
+        on_progress: Optional[Callable[[IndexingStats], Awaitable[None]]] = None
+    ) -> IndexingStats:
+        """Incrementally index all active entries and drop stale points"""
+        stats = IndexingStats()
+        indexed_hashes = await self._load_indexed_hashes()
+        seen: Set[str] = set()
+        pending: List[KBEntry] = []
+
+        # Stream active rows instead of loading the whole table at once
+        query = (
+            select(KBEntry)
+            .where(KBEntry.status == "active")
+            .execution_options(yield_per=settings.indexing_batch_size)
+        )
+        result = await self.db.stream(query)
+        async for partition in result.scalars().partitions(settings.indexing_batch_size):
+            for entry in partition:
+                seen.add(entry.id)
+                if not force and indexed_hashes.get(entry.id) == content_hash(entry):
+                    stats.unchanged += 1
+                    continue
+                pending.append(entry)
+
+            if len(pending) >= settings.indexing_batch_size:
+                stats.indexed += await self._index_batch(pending)
+                pending = []
+                if on_progress:
+                    await on_progress(stats)
+                if batch_delay:
+                    # Throttle background rebuilds so live traffic keeps priority
+                    await asyncio.sleep(batch_delay)
+
+        if pending:
+            stats.indexed += await self._index_batch(pending)
+            if on_progress:
+                await on_progress(stats)
+
+        # Propagate deletes and deactivations
+        stale = set(indexed_hashes) - seen
+        if stale:
+            await self._delete_entries(list(stale))
+            stats.deleted = len(stale)
+
+        logger.info(
+            "Knowledge base index synced",
+            collection=self.collection_name,
+            indexed=stats.indexed,
+            deleted=stats.deleted,
+            unchanged=stats.unchanged
+        )
+        return stats
+
+    async def index_entry(self, entry: KBEntry):
+        """Index a single entry, or remove it if it is no longer active"""
+        if entry.status != "active":
+            await self.remove_entry(entry.id)
+            return
+        await self._index_batch([entry])
+
+    async def remove_entry(self, entry_id: str):
+        """Remove a single entry from the index"""
+        await self._delete_entries([entry_id])
+
+    async def _index_batch(self, entries: List[KBEntry]) -> int:
+        """Chunk and embed a batch of entries in one call and upsert the chunk points"""
+        chunked = [
+            (entry, chunk_text(entry.canonical_answer or "", settings.kb_chunk_tokens, settings.kb_chunk_overlap_tokens))
+            for entry in entries
+        ]
+        vectors = await self.embedding_service.embed_many([
+            self._embedding_text(entry, chunk)
+            for entry, chunks in chunked
+            for chunk in chunks
+        ])
+
+        points = []
+        vector_iter = iter(vectors)
+        for entry, chunks in chunked:
+            for chunk_index, chunk in enumerate(chunks):
+                points.append(models.PointStruct(
+                    id=point_id(entry.id, chunk_index),
+                    vector=next(vector_iter),
+                    payload=self._payload(entry, chunk, chunk_index, len(chunks))
+                ))
+
+        chunk_size = settings.qdrant_upsert_batch_size
+        for start in range(0, len(points), chunk_size):
+            await self.qdrant.upsert(
+                collection_name=self.collection_name,
+                points=points[start:start + chunk_size]
+            )
+
+        # Drop chunks left over from previous versions of these entries
+        await self.qdrant.delete(
+            collection_name=self.collection_name,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="id",
+                            match=models.MatchAny(any=[entry.id for entry in entries])
+                        )
+                    ],
+                    must_not=[
+                        models.FieldCondition(
+                            key="content_hash",
+                            match=models.MatchAny(any=[content_hash(entry) for entry in entries])
+                        )
+                    ]
+                )
+            )
+        )
+        return len(entries)
+
+    async def _delete_entries(self, entry_ids: List[str]):
+        """Delete every chunk point of the given entries"""
+        chunk_size = settings.qdrant_upsert_batch_size
+        for start in range(0, len(entry_ids), chunk_size):
+            await self.qdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="id",
+                                match=models.MatchAny(any=entry_ids[start:start + chunk_size])
+                            )
+                        ]
+                    )
+                )
+            )
+
+    async def _load_indexed_hashes(self) -> Dict[str, str]:
+        """Map of entry id to content hash for everything currently indexed"""
+        hashes = {}
+        async for record in self._scroll(["id", "content_hash"]):
+            entry_id = record.payload.get("id")
+            if entry_id:
+                hashes[entry_id] = record.payload.get("content_hash")
+        return hashes
+
+    async def _scroll(self, fields: List[str]):
+        offset = None
+        while True:
+            records, offset = await self.qdrant.scroll(
+                collection_name=self.collection_name,
+                limit=settings.qdrant_upsert_batch_size,
+                offset=offset,
+                with_payload=fields,
+                with_vectors=False
+            )
+            for record in records:
+                yield record
+            if offset is None:
+                break
+
+    def _embedding_text(self, entry: KBEntry, chunk: str) -> str:
+        if entry.category:
+            return f"{entry.category}: {chunk}"
+        return chunk
+
+    def _payload(self, entry: KBEntry, chunk: str, chunk_index: int, chunk_count: int) -> Dict:
+        # "id" is the parent kb_entries id shared by all chunks of an entry
+        return {
+            "id": entry.id,
+            "chunk_index": chunk_index,
+            "chunk_count": chunk_count,
+            "category": entry.category or "",
+            "language": entry.language,
+            "content": chunk,
+            "follow_up_suggestions": entry.follow_up_suggestions or "",
+            "status": entry.status,
+            "token_count": count_tokens(chunk),
+            "last_updated": entry.last_updated.isoformat() if entry.last_updated else None,
+            "content_hash": content_hash(entry)
+        }
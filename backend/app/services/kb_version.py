@@ -0,0 +1,18 @@
+import structlog
+
+logger = structlog.get_logger()
+
+# Monotonic counter bumped on every knowledge base change; workers compare it
+# against the version their in-process indexes were built from
+KB_VERSION_KEY = "kb:version"
+
+async def get_kb_version(redis) -> int:
+    """Current knowledge base version (0 if never bumped)"""
+    value = await redis.get(KB_VERSION_KEY)
+    return int(value) if value else 0
+
+async def bump_kb_version(redis) -> int:
+    """Record a knowledge base change and return the new version"""
+    version = await redis.incr(KB_VERSION_KEY)
+    logger.debug("Knowledge base version bumped", version=version)
+    return version
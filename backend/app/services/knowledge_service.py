@@ -4,11 +4,19 @@ import structlog
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert, update, delete
+from app.core.config import settings
 from app.models.database import KBEntry, Variable
 from app.schemas.knowledge_base import (
     KBEntryCreate, KBEntryUpdate, KBEntryResponse,
     VariableCreate, VariableResponse, SyncResponse
 )
+from app.core.redis import get_redis
+from app.services.indexing_service import IndexingService
+from app.services.bm25_index import bm25_index
+from app.services.kb_version import bump_kb_version
+from app.services.response_cache import ResponseCache
+from app.services.context_packer import count_tokens
+from app.services.fast_path import invalidate_variables
 
 logger = structlog.get_logger()
 
@@ -61,6 +69,7 @@ class KnowledgeService:
                 language=entry_data.language,
                 canonical_answer=entry_data.canonical_answer,
                 follow_up_suggestions=entry_data.follow_up_suggestions,
+                token_count=count_tokens(entry_data.canonical_answer),
                 status=entry_data.status
             )
             
@@ -68,6 +77,8 @@ class KnowledgeService:
             await self.db.commit()
             await self.db.refresh(entry)
             
+            await self._on_entry_changed(entry)
+            
             return KBEntryResponse(
                 id=entry.id,
                 category=entry.category,
@@ -101,6 +112,7 @@ class KnowledgeService:
                 entry.language = entry_data.language
             if entry_data.canonical_answer is not None:
                 entry.canonical_answer = entry_data.canonical_answer
+                entry.token_count = count_tokens(entry_data.canonical_answer)
             if entry_data.follow_up_suggestions is not None:
                 entry.follow_up_suggestions = entry_data.follow_up_suggestions
             if entry_data.status is not None:
@@ -111,6 +123,8 @@ class KnowledgeService:
             await self.db.commit()
             await self.db.refresh(entry)
             
+            await self._on_entry_changed(entry)
+            
             return KBEntryResponse(
                 id=entry.id,
                 category=entry.category,
@@ -169,6 +183,7 @@ class KnowledgeService:
             
             await self.db.commit()
             await self.db.refresh(variable)
+            await invalidate_variables(await get_redis())
             
             return VariableResponse(
                 key=variable.key,
@@ -185,7 +200,15 @@ class KnowledgeService:
         """Sync knowledge base from external source"""
         try:
             if source == "google_sheets":
-                return await self._sync_from_google_sheets(force_update)
+                result = await self._sync_from_google_sheets(force_update)
+            elif source == "database":
+                # Only refresh the vector index from kb_entries
+                result = SyncResponse(
+                    success=True,
+                    entries_processed=0,
+                    errors=[],
+                    message="Database is the source of truth"
+                )
             else:
                 return SyncResponse(
                     success=False,
@@ -193,6 +216,18 @@ class KnowledgeService:
                     errors=[f"Unknown source: {source}"],
                     message="Unsupported sync source"
                 )
+            
+            if result.success:
+                stats = await IndexingService(self.db).sync_all(force=force_update)
+                result.entries_processed += stats.indexed + stats.deleted
+                result.message = (
+                    f"{result.message}; vector index: {stats.indexed} indexed, "
+                    f"{stats.deleted} removed, {stats.unchanged} unchanged"
+                )
+                if stats.indexed or stats.deleted:
+                    await self._bump_kb_version()
+            
+            return result
                 
         except Exception as e:
             logger.error("Sync failed", error=str(e), source=source)
@@ -213,3 +248,30 @@ class KnowledgeService:
             errors=[],
             message="Google Sheets sync not yet implemented"
         )
+
+    async def _on_entry_changed(self, entry: KBEntry):
+        """Push a committed entry to the search indexes without failing the write"""
+        try:
+            await IndexingService(self.db).index_entry(entry)
+        except Exception as e:
+            logger.error("Failed to index entry", entry_id=entry.id, error=str(e))
+        
+        bm25_index.apply(entry)
+        version = await self._bump_kb_version()
+        if version is not None:
+            bm25_index.mark_version(version)
+
+    async def _bump_kb_version(self) -> Optional[int]:
+        """Signal other workers that the knowledge base changed"""
+        try:
+            redis = await get_redis()
+            version = await bump_kb_version(redis)
+            
+            # Cached answers may cite the old content
+            if settings.response_cache_enabled:
+                await ResponseCache(redis).purge(version)
+            
+            return version
+        except Exception as e:
+            logger.error("Failed to bump knowledge base version", error=str(e))
+            return None
@@ -0,0 +1,161 @@
+from typing import List, Optional
+from contextvars import ContextVar
+import asyncio
+import heapq
+import itertools
+import time
+import structlog
+from prometheus_client import Gauge, Histogram
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+LLM_QUEUE_DEPTH = Gauge(
+    "chatbot_llm_queue_depth",
+    "Calls waiting for an LLM provider slot",
+    ["provider"]
+)
+LLM_QUEUE_WAIT = Histogram(
+    "chatbot_llm_queue_wait_seconds",
+    "Time calls spent waiting for an LLM provider slot",
+    ["provider", "priority"],
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "chatbot_llm_concurrency_limit",
+    "Current adaptive concurrency limit per LLM provider",
+    ["provider"]
+)
+LLM_IN_FLIGHT = Gauge(
+    "chatbot_llm_in_flight",
+    "LLM calls currently holding a provider slot",
+    ["provider"]
+)
+
+# Lower numbers are served first
+DEFAULT_PRIORITY = 5
+BACKGROUND_PRIORITY = 9
+
+_request_priority: ContextVar[int] = ContextVar("llm_request_priority", default=DEFAULT_PRIORITY)
+
+def priority_for_channel(channel: str) -> int:
+    return settings.llm_channel_priorities.get(channel, DEFAULT_PRIORITY)
+
+def set_request_priority(priority: int):
+    """Priority of LLM calls made from the current context (and tasks it spawns)"""
+    _request_priority.set(priority)
+
+def current_priority() -> int:
+    return _request_priority.get()
+
+class AdaptiveLimiter:
+    """Token bucket plus an AIMD concurrency limit, with a priority queue for waiting calls"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.limit = float(settings.llm_limiter_initial_concurrency)
+        self.in_flight = 0
+        self.tokens = float(settings.llm_limiter_burst)
+        self.refilled_at = time.monotonic()
+        self.last_decrease = 0.0
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        LLM_CONCURRENCY_LIMIT.labels(provider=name).set(self.limit)
+
+    async def acquire(self, priority: int):
+        """Wait for a slot; raises asyncio.TimeoutError after llm_limiter_queue_timeout"""
+        start = time.monotonic()
+        if not self._queue and self._try_take():
+            LLM_QUEUE_WAIT.labels(provider=self.name, priority=str(priority)).observe(0.0)
+            return
+
+        # Same-priority waiters are served first come, first served
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        LLM_QUEUE_DEPTH.labels(provider=self.name).set(len(self._queue))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(waiter, settings.llm_limiter_queue_timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up; hand the slot back
+                self.release()
+            else:
+                self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+                heapq.heapify(self._queue)
+                LLM_QUEUE_DEPTH.labels(provider=self.name).set(len(self._queue))
+            raise
+        LLM_QUEUE_WAIT.labels(provider=self.name, priority=str(priority)).observe(time.monotonic() - start)
+
+    def release(self, latency: Optional[float] = None, rate_limited: bool = False):
+        """Return a slot, adapting the limit to how the call went"""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        LLM_IN_FLIGHT.labels(provider=self.name).set(self.in_flight)
+
+        if rate_limited or (latency is not None and latency > settings.llm_limiter_latency_target):
+            self._decrease(rate_limited)
+        elif latency is not None and saturated:
+            # Additive increase: about one extra slot per limit's worth of good calls
+            self.limit = min(float(settings.llm_limiter_max_concurrency), self.limit + 1.0 / self.limit)
+            LLM_CONCURRENCY_LIMIT.labels(provider=self.name).set(self.limit)
+
+        self._dispatch()
+
+    def _decrease(self, rate_limited: bool):
+        now = time.monotonic()
+        if now - self.last_decrease < settings.llm_limiter_cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(float(settings.llm_limiter_min_concurrency), self.limit * settings.llm_limiter_backoff)
+        LLM_CONCURRENCY_LIMIT.labels(provider=self.name).set(self.limit)
+        logger.warning(
+            "LLM concurrency limit reduced",
+            provider=self.name,
+            limit=round(self.limit, 2),
+            reason="rate_limited" if rate_limited else "slow"
+        )
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            float(settings.llm_limiter_burst),
+            self.tokens + (now - self.refilled_at) * settings.llm_limiter_rate
+        )
+        self.refilled_at = now
+
+    def _try_take(self) -> bool:
+        if self.in_flight >= max(1, int(self.limit)):
+            return False
+        self._refill()
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        self.in_flight += 1
+        LLM_IN_FLIGHT.labels(provider=self.name).set(self.in_flight)
+        return True
+
+    def _dispatch(self):
+        """Hand free slots to waiters in priority order"""
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.done():
+                # Timed out or cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            if not self._try_take():
+                break
+            heapq.heappop(self._queue)
+            waiter.set_result(None)
+        LLM_QUEUE_DEPTH.labels(provider=self.name).set(len(self._queue))
+
+        # Concurrency is free but the bucket is empty: wake up when the next token lands
+        if self._queue and self.in_flight < max(1, int(self.limit)) and self._timer is None:
+            delay = max(0.0, (1.0 - self.tokens) / settings.llm_limiter_rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
@@ -0,0 +1,369 @@
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import random
+import time
+import openai
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.llm import get_llm_client, get_llm_model
+from app.services.context_packer import count_tokens, MESSAGE_OVERHEAD_TOKENS
+from app.services.llm_limiter import AdaptiveLimiter, current_priority
+from app.services.usage import record_usage
+
+logger = structlog.get_logger()
+
+LLM_REQUESTS = Counter(
+    "chatbot_llm_requests_total",
+    "LLM provider calls by outcome",
+    ["provider", "outcome"]
+)
+LLM_LATENCY = Histogram(
+    "chatbot_llm_latency_seconds",
+    "Latency of successful LLM provider calls",
+    ["provider"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+)
+LLM_ERROR_RATE = Gauge(
+    "chatbot_llm_error_rate",
+    "Rolling error rate per LLM provider",
+    ["provider"]
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "chatbot_llm_circuit_open",
+    "1 while a provider's circuit breaker is open",
+    ["provider"]
+)
+LLM_HEDGES = Counter(
+    "chatbot_llm_hedges_total",
+    "Hedged requests sent to a backup provider",
+    ["provider"]
+)
+
+class LLMUnavailable(Exception):
+    """No provider could produce a completion"""
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt size for providers that don't report usage (streams, the mock)"""
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+class ProviderHealth:
+    """Rolling latency, error rate and circuit breaker state for one provider"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: Deque[float] = deque(maxlen=settings.llm_latency_window)
+        self.outcomes: Deque[bool] = deque(maxlen=settings.llm_latency_window)
+        self.failure_streak = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_quantile(self, quantile: float) -> Optional[float]:
+        if len(self.latencies) < settings.llm_hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def available(self) -> bool:
+        if self.open_until == 0.0:
+            return True
+        return time.monotonic() >= self.open_until and not self.probing
+
+    def acquire(self) -> bool:
+        """Closed circuits allow every call; an expired open circuit allows a single probe"""
+        if not self.available():
+            return False
+        if self.open_until:
+            self.probing = True
+        return True
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.failure_streak = 0
+        if self.open_until:
+            logger.info("LLM provider circuit closed", provider=self.name)
+        self.open_until = 0.0
+        self.probing = False
+        self._export()
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.failure_streak += 1
+        if self.probing or self.failure_streak >= settings.llm_breaker_failure_threshold:
+            self.open_until = time.monotonic() + settings.llm_breaker_reset_timeout
+            logger.warning(
+                "LLM provider circuit opened",
+                provider=self.name,
+                failure_streak=self.failure_streak,
+                error_rate=round(self.error_rate, 3)
+            )
+        self.probing = False
+        self._export()
+
+    def release(self):
+        """Forget an attempt that was cancelled before it finished"""
+        self.probing = False
+
+    def _export(self):
+        LLM_ERROR_RATE.labels(provider=self.name).set(self.error_rate)
+        LLM_CIRCUIT_OPEN.labels(provider=self.name).set(1 if self.open_until else 0)
+
+class OpenAICompatibleProvider:
+    """A provider reached through the OpenAI chat completions API"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.client = get_llm_client(name)
+        self.model = get_llm_model(name)
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> Tuple[str, int, int]:
+        """Completion text with prompt and completion token counts"""
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **params
+        )
+        text = response.choices[0].message.content.strip()
+        if response.usage is None:
+            return text, estimate_prompt_tokens(messages), count_tokens(text)
+        return text, response.usage.prompt_tokens, response.usage.completion_tokens
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class MockProvider:
+    """In-process provider with configurable latency and failures, for local testing"""
+
+    name = "mock"
+    model = "mock"
+
+    async def complete(self, messages: List[Dict[str, str]], **params) -> Tuple[str, int, int]:
+        await asyncio.sleep(settings.llm_mock_latency_ms / 1000)
+        if random.random() < settings.llm_mock_error_rate:
+            raise RuntimeError("Mock provider failure")
+        text = f"[mock] {messages[-1]['content'][-200:]}"
+        return text, estimate_prompt_tokens(messages), count_tokens(text)
+
+    async def stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        text, _, _ = await self.complete(messages, **params)
+        for word in text.split(" "):
+            yield word + " "
+
+class LLMRouter:
+    """Routes completions across providers with failover, circuit breakers, hedging and rate limiting"""
+
+    def __init__(self):
+        self.health: Dict[str, ProviderHealth] = {}
+        self.limiters: Dict[str, AdaptiveLimiter] = {}
+
+    def providers(self) -> List:
+        """Configured providers in priority order"""
+        providers = []
+        for name in (part.strip() for part in settings.llm_providers.split(",")):
+            if name == "mock":
+                providers.append(MockProvider())
+            elif get_llm_client(name) is not None:
+                providers.append(OpenAICompatibleProvider(name))
+        return providers
+
+    def available(self) -> bool:
+        return bool(self.providers())
+
+    def _health(self, name: str) -> ProviderHealth:
+        if name not in self.health:
+            self.health[name] = ProviderHealth(name)
+        return self.health[name]
+
+    def _limiter(self, name: str) -> AdaptiveLimiter:
+        if name not in self.limiters:
+            self.limiters[name] = AdaptiveLimiter(name)
+        return self.limiters[name]
+
+    def _candidates(self) -> List:
+        candidates = [p for p in self.providers() if self._health(p.name).available()]
+        if not candidates:
+            raise LLMUnavailable("All LLM provider circuits are open")
+        return candidates
+
+    async def complete(self, messages: List[Dict[str, str]], stage: str = "completion", **params) -> str:
+        """Complete on the first healthy provider, hedging to the next one past its latency quantile"""
+        queue = self._candidates()
+        pending: Dict[asyncio.Task, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch():
+            while queue:
+                provider = queue.pop(0)
+                if self._health(provider.name).acquire():
+                    pending[asyncio.ensure_future(self._attempt(provider, messages, stage, params))] = provider.name
+                    return
+
+        launch()
+        try:
+            while pending:
+                hedge_after = None
+                if settings.llm_hedge_enabled and queue and len(pending) == 1:
+                    primary = next(iter(pending.values()))
+                    hedge_after = self._health(primary).latency_quantile(settings.llm_hedge_quantile)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slower than usual; race a backup rather than wait out the tail
+                    LLM_HEDGES.labels(provider=queue[0].name).inc()
+                    launch()
+                    continue
+
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+
+                if not pending and queue:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise LLMUnavailable("All LLM providers failed") from last_error
+
+    async def stream(self, messages: List[Dict[str, str]], stage: str = "completion", **params) -> AsyncIterator[str]:
+        """Stream from the first provider that produces a token, failing over until one does"""
+        last_error: Optional[Exception] = None
+        for provider in self._candidates():
+            health = self._health(provider.name)
+            if not health.acquire():
+                continue
+            limiter = self._limiter(provider.name)
+            try:
+                await self._wait_for_slot(provider.name, limiter)
+            except asyncio.TimeoutError as e:
+                last_error = e
+                continue
+
+            start = time.monotonic()
+            stream = provider.stream(messages, **params)
+            parts: List[str] = []
+            latency: Optional[float] = None
+            rate_limited = False
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), settings.llm_first_token_timeout)
+                # Streams adapt the limit on time to first token, not total generation time
+                latency = time.monotonic() - start
+                parts.append(first)
+                yield first
+                async for delta in stream:
+                    parts.append(delta)
+                    yield delta
+            except StopAsyncIteration:
+                pass
+            except (asyncio.CancelledError, GeneratorExit):
+                health.release()
+                raise
+            except Exception as e:
+                self._record_failure(provider.name, e)
+                rate_limited = isinstance(e, openai.RateLimitError)
+                if latency is None and isinstance(e, asyncio.TimeoutError):
+                    latency = time.monotonic() - start
+                if parts:
+                    # Tokens already reached the caller; a second provider would repeat them
+                    self._record_stream_usage(provider, messages, stage, parts, time.monotonic() - start)
+                    raise
+                last_error = e
+                continue
+            finally:
+                await stream.aclose()
+                limiter.release(latency, rate_limited)
+
+            total = time.monotonic() - start
+            self._record_success(provider.name, total)
+            self._record_stream_usage(provider, messages, stage, parts, total)
+            return
+
+        raise LLMUnavailable("All LLM providers failed") from last_error
+
+    async def _attempt(self, provider, messages: List[Dict[str, str]], stage: str, params: Dict) -> str:
+        limiter = self._limiter(provider.name)
+        await self._wait_for_slot(provider.name, limiter)
+
+        start = time.monotonic()
+        latency: Optional[float] = None
+        rate_limited = False
+        try:
+            text, prompt_tokens, completion_tokens = await asyncio.wait_for(
+                provider.complete(messages, **params), settings.llm_request_timeout
+            )
+            latency = time.monotonic() - start
+        except asyncio.CancelledError:
+            # Lost a hedge race; not the provider's fault
+            self._health(provider.name).release()
+            LLM_REQUESTS.labels(provider=provider.name, outcome="cancelled").inc()
+            raise
+        except Exception as e:
+            self._record_failure(provider.name, e)
+            rate_limited = isinstance(e, openai.RateLimitError)
+            if isinstance(e, asyncio.TimeoutError):
+                latency = time.monotonic() - start
+            raise
+        finally:
+            limiter.release(latency, rate_limited)
+
+        self._record_success(provider.name, latency)
+        record_usage(provider.name, provider.model, stage, prompt_tokens, completion_tokens, latency)
+        return text
+
+    async def _wait_for_slot(self, name: str, limiter: AdaptiveLimiter):
+        """Queue for a provider slot by request priority; queue time doesn't count against the provider"""
+        try:
+            await limiter.acquire(current_priority())
+        except asyncio.TimeoutError:
+            self._health(name).release()
+            LLM_REQUESTS.labels(provider=name, outcome="queue_timeout").inc()
+            logger.warning("LLM call timed out waiting for a provider slot", provider=name)
+            raise
+        except BaseException:
+            self._health(name).release()
+            raise
+
+    def _record_stream_usage(self, provider, messages: List[Dict[str, str]], stage: str, parts: List[str], latency: float):
+        # Streamed responses carry no usage block, so both sides are counted locally
+        record_usage(
+            provider.name,
+            provider.model,
+            stage,
+            estimate_prompt_tokens(messages),
+            count_tokens("".join(parts)),
+            latency
+        )
+
+    def _record_success(self, name: str, latency: float):
+        self._health(name).record_success(latency)
+        LLM_REQUESTS.labels(provider=name, outcome="success").inc()
+        LLM_LATENCY.labels(provider=name).observe(latency)
+
+    def _record_failure(self, name: str, error: Exception):
+        outcome = "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        self._health(name).record_failure()
+        LLM_REQUESTS.labels(provider=name, outcome=outcome).inc()
+        logger.warning("LLM provider call failed", provider=name, outcome=outcome, error=str(error))
+
+llm_router = LLMRouter()
@@ -1,26 +1,41 @@
-from typing import List, Dict, Any
-import openai
+from typing import List, Dict, Any, AsyncIterator, Optional
+import hashlib
+import json
 import structlog
 
-from app.core.config import settings
 from app.schemas.chat import ChatMessage, RAGContext
+from app.core.config import settings
+from app.services.context_packer import ContextPacker, count_tokens, MESSAGE_OVERHEAD_TOKENS
+from app.services.embedding_cache import normalize_text
+from app.services.llm_router import llm_router
+from app.services.single_flight import SingleFlight
 
 logger = structlog.get_logger()
 
+completion_flight = SingleFlight("completion")
+
+def prompt_fingerprint(messages: List[Dict[str, str]], **params) -> str:
+    """Key identifying completions that would be answered identically"""
+    normalized = [(m["role"], normalize_text(m["content"])) for m in messages]
+    payload = json.dumps([settings.llm_providers, sorted(params.items()), normalized])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 class LLMService:
-    def __init__(self):
-        self.client = None
-        if settings.openai_api_key:
-            self.client = openai.OpenAI(api_key=settings.openai_api_key)
+    def __init__(self, redis=None):
+        self.last_failed = False
+        self.router = llm_router
+        self.redis = redis
 
     async def generate_response(
         self, 
         user_message: str, 
         conversation_context: List[ChatMessage],
         rag_context: RAGContext,
-        language: str = "en"
+        language: str = "en",
+        summary: Optional[str] = None
     ) -> str:
         """Generate response using LLM"""
+        self.last_failed = False
         try:
             # Build system prompt
             system_prompt = self._build_system_prompt(language)
@@ -30,12 +45,13 @@ class LLMService:
                 system_prompt, 
                 conversation_context, 
                 user_message, 
-                rag_context
+                rag_context,
+                summary
             )
             
             # Generate response
-            if self.client:
-                response = await self._generate_with_openai(messages)
+            if self.router.available():
+                response = await self._complete(messages, max_tokens=500, temperature=0.7)
             else:
                 response = await self._generate_fallback(user_message, rag_context)
             
@@ -43,7 +59,43 @@ class LLMService:
             
         except Exception as e:
             logger.error("LLM generation failed", error=str(e))
-            return self._generate_error_response(language)
+            self.last_failed = True
+            return self._generate_degraded_response(rag_context, language)
+
+    async def stream_response(
+        self, 
+        user_message: str, 
+        conversation_context: List[ChatMessage],
+        rag_context: RAGContext,
+        language: str = "en",
+        summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Generate response using LLM, yielding text deltas as they arrive"""
+        self.last_failed = False
+        emitted = False
+        try:
+            system_prompt = self._build_system_prompt(language)
+            messages = self._build_messages(
+                system_prompt, 
+                conversation_context, 
+                user_message, 
+                rag_context,
+                summary
+            )
+            
+            if self.router.available():
+                async for delta in self.router.stream(messages, max_tokens=500, temperature=0.7):
+                    emitted = True
+                    yield delta
+            else:
+                yield await self._generate_fallback(user_message, rag_context)
+            
+        except Exception as e:
+            logger.error("LLM streaming failed", error=str(e), partial=emitted)
+            self.last_failed = True
+            # Tokens already sent cannot be taken back
+            if not emitted:
+                yield self._generate_degraded_response(rag_context, language)
 
     def _build_system_prompt(self, language: str) -> str:
         """Build system prompt based on language and context"""
@@ -65,10 +117,18 @@ class LLMService:
         system_prompt: str, 
         conversation_context: List[ChatMessage],
         user_message: str,
-        rag_context: RAGContext
+        rag_context: RAGContext,
+        summary: Optional[str] = None
     ) -> List[Dict[str, str]]:
         """Build messages for LLM API"""
         messages = [{"role": "system", "content": system_prompt}]
+        used_tokens = rag_context.context_tokens
+        
+        # Turns compacted out of the session arrive as a rolling summary
+        if summary:
+            summary_message = f"Summary of the earlier conversation: {summary}"
+            messages.append({"role": "system", "content": summary_message})
+            used_tokens += count_tokens(summary_message) + MESSAGE_OVERHEAD_TOKENS
         
         # Add context if available
         if rag_context.context_text:
@@ -76,8 +136,13 @@ class LLMService:
         else:
             context_message = user_message
         
-        # Add conversation history
-        for msg in conversation_context[-5:]:  # Last 5 messages
+        # The session already holds the current message; it is sent below with its context
+        history = conversation_context
+        if history and history[-1].role == "user" and history[-1].content == user_message:
+            history = history[:-1]
+        
+        # Add as much recent history as the token budget left over from the KB context and summary
+        for msg in ContextPacker().pack_history(history, used_tokens):
             messages.append({
                 "role": msg.role,
                 "content": msg.content
@@ -91,20 +156,13 @@ class LLMService:
         
         return messages
 
-    async def _generate_with_openai(self, messages: List[Dict[str, str]]) -> str:
-        """Generate response using OpenAI API"""
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            logger.error("OpenAI API call failed", error=str(e))
-            raise
+    async def _complete(self, messages: List[Dict[str, str]], **params) -> str:
+        """Complete through the router, sharing one call among identical concurrent prompts"""
+        return await completion_flight.do(
+            prompt_fingerprint(messages, **params),
+            lambda: self.router.complete(messages, **params),
+            self.redis
+        )
 
     async def _generate_fallback(self, user_message: str, rag_context: RAGContext) -> str:
         """Fallback response generation when LLM is not available"""
@@ -115,6 +173,15 @@ class LLMService:
         else:
             return "I'm sorry, I don't have enough information to answer your question. Please contact our support team for assistance."
 
+    def _generate_degraded_response(self, rag_context: RAGContext, language: str) -> str:
+        """Answer from the knowledge base when every provider failed, else apologise"""
+        if rag_context.retrieved_docs:
+            best_doc = rag_context.retrieved_docs[0]
+            if language == "id":
+                return f"Berdasarkan basis pengetahuan kami: {best_doc['content']}"
+            return f"Based on our knowledge base: {best_doc['content']}"
+        return self._generate_error_response(language)
+
     def _generate_error_response(self, language: str) -> str:
         """Generate error response when LLM fails"""
         if language == "id":
@@ -1,46 +1,72 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import structlog
-import openai
 from qdrant_client.http import models
 
 from app.core.config import settings
-from app.core.qdrant import get_qdrant
+from app.core.qdrant import get_qdrant, search_params
 from app.schemas.chat import RAGContext
+from app.services.embedding_service import EmbeddingService
+from app.services.bm25_index import bm25_index, tokenize
+from app.services.chunker import chunk_text
+from app.services.vector_index import vector_index
+from app.services.context_packer import ContextPacker, count_tokens
 
 logger = structlog.get_logger()
 
+# Postgres text search configuration per supported language
+FTS_CONFIGS = {
+    "en": "english",
+    "id": "indonesian"
+}
+
 class RAGService:
     def __init__(self, db, redis):
         self.db = db
         self.redis = redis
         self.qdrant = get_qdrant()
+        self.embedding_service = EmbeddingService(redis)
 
-    async def retrieve_context(self, query: str, language: str = "en") -> RAGContext:
+    async def retrieve_context(
+        self,
+        query: str,
+        language: str = "en",
+        embedding: Optional[List[float]] = None
+    ) -> RAGContext:
         """Retrieve relevant context using hybrid search"""
         try:
-            # Generate embedding for query
-            embedding = await self._generate_embedding(query)
-            
-            # Semantic search in Qdrant
-            semantic_results = self._semantic_search(embedding, language)
-            
-            # Lexical search in PostgreSQL (if available)
-            lexical_results = await self._lexical_search(query, language)
+            # Run semantic (Qdrant) and lexical (PostgreSQL) legs concurrently
+            semantic_results, lexical_results = await asyncio.gather(
+                self._run_leg(
+                    "semantic",
+                    self._semantic_leg(query, language, embedding),
+                    settings.semantic_search_timeout
+                ),
+                self._run_leg(
+                    "lexical",
+                    self._lexical_search(query, language),
+                    settings.lexical_search_timeout
+                )
+            )
             
             # Combine and rank results
             combined_results = self._combine_results(semantic_results, lexical_results)
             
-            # Build context text
-            context_text = self._build_context_text(combined_results)
-            
             # Calculate confidence score
             confidence_score = self._calculate_confidence(combined_results)
             
+            # Keep the best non-duplicate passages within the token budget
+            packed_results, context_tokens = ContextPacker().pack_documents(combined_results)
+            
+            # Build context text
+            context_text = self._build_context_text(packed_results)
+            
             return RAGContext(
                 query=query,
-                retrieved_docs=combined_results,
+                retrieved_docs=packed_results,
                 context_text=context_text,
-                confidence_score=confidence_score
+                confidence_score=confidence_score,
+                context_tokens=context_tokens
             )
             
         except Exception as e:
@@ -52,39 +78,44 @@ class RAGService:
                 confidence_score=0.0
             )
 
-    async def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI API"""
+    async def _run_leg(self, name: str, leg, timeout: float) -> List[Dict[str, Any]]:
+        """Await a retrieval leg, dropping it if it exceeds its timeout"""
         try:
-            if not settings.openai_api_key:
-                # Fallback to simple text processing
-                return self._simple_embedding(text)
-            
-            client = openai.OpenAI(api_key=settings.openai_api_key)
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            return response.data[0].embedding
-            
-        except Exception as e:
-            logger.error("Embedding generation failed", error=str(e))
-            return self._simple_embedding(text)
-
-    def _simple_embedding(self, text: str) -> List[float]:
-        """Simple fallback embedding (not recommended for production)"""
-        # This is a placeholder - in production, use a proper embedding model
-        import hashlib
-        hash_obj = hashlib.md5(text.encode())
-        hash_bytes = hash_obj.digest()
-        return [float(b) / 255.0 for b in hash_bytes[:16]] + [0.0] * 368  # Pad to 384 dimensions
-
-    def _semantic_search(self, embedding: List[float], language: str) -> List[Dict[str, Any]]:
+            return await asyncio.wait_for(leg, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Retrieval leg timed out", leg=name, timeout=timeout)
+            return []
+
+    async def _semantic_leg(
+        self,
+        query: str,
+        language: str,
+        embedding: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Embed the query (unless already embedded) and search Qdrant"""
+        if embedding is None:
+            embedding = await self.embed_query(query)
+        return await self._semantic_search(embedding, language)
+
+    async def embed_query(self, text: str) -> List[float]:
+        """Generate embedding for the query"""
+        return await self.embedding_service.embed(text)
+
+    async def _semantic_search(self, embedding: List[float], language: str) -> List[Dict[str, Any]]:
+        """Perform semantic search with the configured vector backend"""
+        if settings.vector_search_backend == "local" and vector_index.ready:
+            hits = vector_index.search(embedding, language, settings.max_retrieved_docs)
+            return [self._semantic_result(payload, score) for score, payload in hits]
+        return await self._semantic_search_qdrant(embedding, language)
+
+    async def _semantic_search_qdrant(self, embedding: List[float], language: str) -> List[Dict[str, Any]]:
         """Perform semantic search in Qdrant"""
         try:
-            search_result = self.qdrant.search(
+            search_result = await self.qdrant.search(
                 collection_name=settings.qdrant_collection,
                 query_vector=embedding,
                 limit=settings.max_retrieved_docs,
+                search_params=search_params(),
                 query_filter=models.Filter(
                     must=[
                         models.FieldCondition(
@@ -99,54 +130,86 @@ class RAGService:
                 )
             )
             
-            results = []
-            for hit in search_result:
-                results.append({
-                    "id": hit.payload.get("id"),
-                    "content": hit.payload.get("canonical_answer", ""),
-                    "category": hit.payload.get("category", ""),
-                    "score": hit.score,
-                    "follow_up_suggestions": hit.payload.get("follow_up_suggestions", "")
-                })
-            
-            return results
+            return [self._semantic_result(hit.payload, hit.score) for hit in search_result]
             
         except Exception as e:
             logger.error("Semantic search failed", error=str(e))
             return []
 
+    def _semantic_result(self, payload: Dict[str, Any], score: float) -> Dict[str, Any]:
+        """Map a vector hit payload to a retrieved document (or chunk of one)"""
+        return {
+            "id": payload.get("id"),
+            "chunk_index": payload.get("chunk_index", 0),
+            # Points indexed before chunking carry the whole canonical_answer
+            "content": payload.get("content", payload.get("canonical_answer", "")),
+            "category": payload.get("category", ""),
+            "score": score,
+            "follow_up_suggestions": payload.get("follow_up_suggestions", ""),
+            "token_count": payload.get("token_count"),
+            "source": "semantic"
+        }
+
     async def _lexical_search(self, query: str, language: str) -> List[Dict[str, Any]]:
-        """Perform lexical search in PostgreSQL"""
+        """Perform lexical search with the configured backend"""
+        if settings.lexical_backend == "bm25" and bm25_index.ready:
+            results = bm25_index.search(query, language, settings.max_retrieved_docs)
+        else:
+            results = await self._lexical_search_postgres(query, language)
+        # Lexical hits are whole entries; narrow them to a chunk like semantic hits
+        return [self._best_chunk(result, query) for result in results]
+
+    def _best_chunk(self, result: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Replace a whole-entry hit with its chunk that matches the most query terms"""
+        chunks = chunk_text(result["content"] or "", settings.kb_chunk_tokens, settings.kb_chunk_overlap_tokens)
+        if len(chunks) == 1:
+            return result
+
+        terms = set(tokenize(query))
+
+        def overlap(index: int):
+            tokens = tokenize(chunks[index])
+            # Distinct terms matched first, then total matches; earlier chunks win ties
+            return (len(terms.intersection(tokens)), sum(token in terms for token in tokens), -index)
+
+        best = max(range(len(chunks)), key=overlap)
+        return dict(
+            result,
+            content=chunks[best],
+            chunk_index=best,
+            token_count=count_tokens(chunks[best])
+        )
+
+    async def _lexical_search_postgres(self, query: str, language: str) -> List[Dict[str, Any]]:
+        """Perform full-text search in PostgreSQL"""
         try:
             if not self.db:
                 return []
             
             from sqlalchemy import text
             
-            # Simple keyword search
+            # Match any query term (OR) and let ts_rank_cd order by density;
+            # normalization 32 scales the rank into 0..1 as rank / (rank + 1)
             search_query = text("""
-                SELECT id, canonical_answer, category, follow_up_suggestions
-                FROM kb_entries 
-                WHERE language = :language 
-                AND status = 'active'
-                AND (
-                    canonical_answer ILIKE :query
-                    OR category ILIKE :query
+                WITH q AS (
+                    SELECT replace(
+                        plainto_tsquery(CAST(:config AS regconfig), :query)::text, ' & ', ' | '
+                    )::tsquery AS query
                 )
-                ORDER BY 
-                    CASE 
-                        WHEN canonical_answer ILIKE :exact_query THEN 1
-                        WHEN canonical_answer ILIKE :partial_query THEN 2
-                        ELSE 3
-                    END
+                SELECT id, canonical_answer, category, follow_up_suggestions, token_count,
+                       ts_rank_cd(search_vector, q.query, 32) AS rank
+                FROM kb_entries, q
+                WHERE language = :language
+                AND status = 'active'
+                AND search_vector @@ q.query
+                ORDER BY rank DESC
                 LIMIT :limit
             """)
             
             result = await self.db.execute(search_query, {
+                "config": FTS_CONFIGS.get(language, "simple"),
                 "language": language,
-                "query": f"%{query}%",
-                "exact_query": f"%{query}%",
-                "partial_query": f"%{query}%",
+                "query": query,
                 "limit": settings.max_retrieved_docs
             })
             
@@ -156,8 +219,10 @@ class RAGService:
                     "id": row.id,
                     "content": row.canonical_answer,
                     "category": row.category,
-                    "score": 0.8,  # Fixed score for lexical results
-                    "follow_up_suggestions": row.follow_up_suggestions or ""
+                    "score": float(row.rank),
+                    "follow_up_suggestions": row.follow_up_suggestions or "",
+                    "token_count": row.token_count,
+                    "source": "lexical"
                 })
             
             return results
@@ -171,11 +236,12 @@ class RAGService:
         # Create a map to avoid duplicates
         results_map = {}
         
-        # Add semantic results (higher weight)
+        # Add semantic results (higher weight), grouping matched chunks by parent entry
+        chunks_by_parent: Dict[str, List[Dict]] = {}
         for result in semantic_results:
-            doc_id = result["id"]
-            if doc_id not in results_map or result["score"] > results_map[doc_id]["score"]:
-                results_map[doc_id] = result
+            chunks_by_parent.setdefault(result["id"], []).append(result)
+        for doc_id, chunks in chunks_by_parent.items():
+            results_map[doc_id] = self._merge_chunks(chunks)
         
         # Add lexical results
         for result in lexical_results:
@@ -189,6 +255,18 @@ class RAGService:
         
         return combined[:settings.max_retrieved_docs]
 
+    def _merge_chunks(self, chunks: List[Dict]) -> Dict:
+        """Merge the matching chunks of one entry into a single document in reading order"""
+        if len(chunks) == 1:
+            return chunks[0]
+        
+        ordered = sorted(chunks, key=lambda c: c.get("chunk_index", 0))
+        merged = dict(max(chunks, key=lambda c: c["score"]))
+        merged["content"] = "\n...\n".join(c["content"] for c in ordered)
+        counts = [c.get("token_count") for c in ordered]
+        merged["token_count"] = sum(counts) if all(counts) else None
+        return merged
+
     def _build_context_text(self, results: List[Dict]) -> str:
         """Build context text from retrieved documents"""
         if not results:
@@ -0,0 +1,141 @@
+from typing import Optional
+from datetime import datetime
+import asyncio
+import time
+import structlog
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.qdrant import (
+    KB_PAYLOAD_INDEXES, get_qdrant, provision_collection, resolve_alias, versioned_collection_name
+)
+from app.schemas.knowledge_base import IndexingStats, ReindexStatus
+from app.services.indexing_service import IndexingService
+from app.services.kb_version import bump_kb_version
+
+logger = structlog.get_logger()
+
+REINDEX_STATUS_KEY = "kb:reindex:status"
+REINDEX_LOCK_KEY = "kb:reindex:lock"
+
+# Strong reference to the running rebuild so it isn't garbage collected
+_reindex_task: Optional[asyncio.Task] = None
+
+class ReindexService:
+    """Rebuilds the knowledge base into a new collection and swaps the alias"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.qdrant = get_qdrant()
+        self.alias = settings.qdrant_collection
+
+    async def start(self) -> ReindexStatus:
+        """Start a background rebuild unless one is already running"""
+        global _reindex_task
+        acquired = await self.redis.set(
+            REINDEX_LOCK_KEY, "1", nx=True, ex=settings.reindex_lock_ttl
+        )
+        if not acquired:
+            return await self.get_status()
+
+        target = versioned_collection_name(self.alias, int(time.time()))
+        await self._set_status(
+            state="running",
+            collection=target,
+            previous=await resolve_alias(self.alias) or self.alias,
+            indexed=0,
+            started_at=datetime.now().isoformat(),
+            finished_at="",
+            error=""
+        )
+        _reindex_task = asyncio.create_task(self._run(target))
+        return await self.get_status()
+
+    async def get_status(self) -> ReindexStatus:
+        data = await self.redis.hgetall(REINDEX_STATUS_KEY)
+        if not data:
+            return ReindexStatus(state="idle")
+        return ReindexStatus(
+            state=data.get("state", "idle"),
+            collection=data.get("collection") or None,
+            previous=data.get("previous") or None,
+            indexed=int(data.get("indexed") or 0),
+            started_at=data.get("started_at") or None,
+            finished_at=data.get("finished_at") or None,
+            error=data.get("error") or None
+        )
+
+    async def _run(self, target: str):
+        try:
+            await provision_collection(target, KB_PAYLOAD_INDEXES)
+
+            async with AsyncSessionLocal() as db:
+                indexing = IndexingService(db, self.redis, collection_name=target)
+
+                # Throttled full fill of the new collection
+                await indexing.sync_all(
+                    force=True,
+                    batch_delay=settings.reindex_batch_delay_ms / 1000.0,
+                    on_progress=self._report_progress
+                )
+                # Catch up on entries edited while the fill was running
+                await indexing.sync_all()
+
+            await self._set_status(state="swapping")
+            previous = await self._swap_alias(target)
+
+            # Writes between the catch-up and the swap went to the old collection
+            async with AsyncSessionLocal() as db:
+                await IndexingService(db, self.redis).sync_all()
+
+            if previous and previous != target:
+                await self.qdrant.delete_collection(previous)
+                logger.info("Retired collection", collection=previous)
+
+            # Let in-process indexes and the response cache pick up the new collection
+            await bump_kb_version(self.redis)
+
+            await self._set_status(state="completed", finished_at=datetime.now().isoformat())
+            logger.info("Reindex completed", alias=self.alias, collection=target)
+
+        except Exception as e:
+            logger.error("Reindex failed", collection=target, error=str(e))
+            await self._set_status(state="failed", finished_at=datetime.now().isoformat(), error=str(e))
+            try:
+                if await resolve_alias(self.alias) != target:
+                    await self.qdrant.delete_collection(target)
+            except Exception:
+                pass
+        finally:
+            await self.redis.delete(REINDEX_LOCK_KEY)
+
+    async def _swap_alias(self, target: str) -> Optional[str]:
+        """Point the alias at the new collection and return the old one"""
+        previous = await resolve_alias(self.alias)
+        operations = []
+
+        if previous is not None:
+            operations.append(models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=self.alias)
+            ))
+        else:
+            # Legacy deployment: a plain collection owns the alias name and has
+            # to go first; searches miss only for the duration of this call
+            await self.qdrant.delete_collection(self.alias)
+
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=self.alias)
+        ))
+
+        # Delete + create in one request is applied atomically by Qdrant
+        await self.qdrant.update_collection_aliases(change_aliases_operations=operations)
+        logger.info("Alias switched", alias=self.alias, collection=target, previous=previous)
+        return previous
+
+    async def _report_progress(self, stats: IndexingStats):
+        await self._set_status(indexed=stats.indexed)
+        await self.redis.expire(REINDEX_LOCK_KEY, settings.reindex_lock_ttl)
+
+    async def _set_status(self, **fields):
+        await self.redis.hset(REINDEX_STATUS_KEY, mapping={k: str(v) for k, v in fields.items()})
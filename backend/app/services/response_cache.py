@@ -0,0 +1,138 @@
+from typing import List, Optional
+import time
+import uuid
+import structlog
+from prometheus_client import Counter
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.core.qdrant import get_qdrant, search_params
+from app.schemas.chat import CachedResponse
+from app.services.embedding_cache import normalize_text
+from app.services.kb_version import get_kb_version
+
+logger = structlog.get_logger()
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "chatbot_response_cache_requests_total",
+    "Semantic response cache lookups by result",
+    ["result"]
+)
+
+# Namespace for cache point ids, so re-storing the same question overwrites it
+RESPONSE_POINT_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "social-media-chatbot/response_cache")
+
+class ResponseCache:
+    """Answers keyed by query embedding, language and knowledge base version"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.qdrant = get_qdrant()
+        self.collection_name = settings.response_cache_collection
+
+    async def lookup(self, embedding: List[float], language: str) -> Optional[CachedResponse]:
+        """Return a cached answer for a near-duplicate question, if any"""
+        try:
+            kb_version = await get_kb_version(self.redis)
+            hits = await self.qdrant.search(
+                collection_name=self.collection_name,
+                query_vector=embedding,
+                limit=1,
+                search_params=search_params(),
+                score_threshold=1.0 - settings.response_cache_max_distance,
+                query_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="language",
+                            match=models.MatchValue(value=language)
+                        ),
+                        models.FieldCondition(
+                            key="kb_version",
+                            match=models.MatchValue(value=kb_version)
+                        ),
+                        models.FieldCondition(
+                            key="expires_at",
+                            range=models.Range(gt=time.time())
+                        )
+                    ]
+                )
+            )
+        except Exception as e:
+            logger.error("Response cache lookup failed", error=str(e))
+            RESPONSE_CACHE_REQUESTS.labels(result="error").inc()
+            return None
+
+        if not hits:
+            RESPONSE_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+
+        RESPONSE_CACHE_REQUESTS.labels(result="hit").inc()
+        payload = hits[0].payload
+        return CachedResponse(
+            response=payload["response"],
+            suggested_actions=payload.get("suggested_actions"),
+            confidence_score=payload.get("confidence_score"),
+            similarity=hits[0].score
+        )
+
+    async def store(
+        self,
+        embedding: List[float],
+        language: str,
+        query: str,
+        response: str,
+        suggested_actions: Optional[List[str]],
+        confidence_score: Optional[float]
+    ):
+        """Cache an answer under the current knowledge base version"""
+        try:
+            kb_version = await get_kb_version(self.redis)
+            point_id = str(uuid.uuid5(
+                RESPONSE_POINT_NAMESPACE,
+                f"{language}:{kb_version}:{normalize_text(query)}"
+            ))
+            await self.qdrant.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    models.PointStruct(
+                        id=point_id,
+                        vector=embedding,
+                        payload={
+                            "language": language,
+                            "kb_version": kb_version,
+                            "query": query,
+                            "response": response,
+                            "suggested_actions": suggested_actions,
+                            "confidence_score": confidence_score,
+                            "expires_at": time.time() + settings.response_cache_ttl
+                        }
+                    )
+                ],
+                wait=False
+            )
+        except Exception as e:
+            logger.error("Response cache store failed", error=str(e))
+
+    async def purge(self, kb_version: int):
+        """Drop answers built on an older knowledge base or past their TTL"""
+        try:
+            await self.qdrant.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        should=[
+                            models.FieldCondition(
+                                key="kb_version",
+                                range=models.Range(lt=kb_version)
+                            ),
+                            models.FieldCondition(
+                                key="expires_at",
+                                range=models.Range(lt=time.time())
+                            )
+                        ]
+                    )
+                ),
+                wait=False
+            )
+        except Exception as e:
+            logger.error("Response cache purge failed", error=str(e))
@@ -0,0 +1,196 @@
+from typing import List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import time
+import uuid
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.schemas.chat import ChatMessage, SessionData
+
+logger = structlog.get_logger()
+
+SESSION_CACHE_LOOKUPS = Counter(
+    "chatbot_session_cache_lookups_total",
+    "Session near-cache lookups by result",
+    ["result"]
+)
+SESSION_CACHE_INVALIDATIONS = Counter(
+    "chatbot_session_cache_invalidations_total",
+    "Session near-cache invalidations by origin",
+    ["source"]
+)
+SESSION_CACHE_ENTRIES = Gauge(
+    "chatbot_session_cache_entries",
+    "Sessions held in this worker's near-cache"
+)
+SESSION_CACHE_HIT_AGE = Histogram(
+    "chatbot_session_cache_hit_age_seconds",
+    "Age of near-cache entries when served",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+SESSION_CACHE_INVALIDATION_LAG = Histogram(
+    "chatbot_session_cache_invalidation_lag_seconds",
+    "Delay between a session write on one worker and its invalidation on another",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+class SessionNearCache:
+    """Size-bounded in-process LRU of sessions, kept consistent across workers over pub/sub"""
+
+    def __init__(self, max_entries: int, ttl: float, channel: str):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.connected = False
+        self._entries: "OrderedDict[str, Tuple[SessionData, float]]" = OrderedDict()
+        # A fill is rejected if its key was invalidated after the read started
+        self._generation = 0
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._floor = 0
+        self._listener_task: Optional[asyncio.Task] = None
+
+    def get(self, user_id: str) -> Optional[SessionData]:
+        # Without the invalidation feed, other workers' writes would go unnoticed
+        if not self.connected:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None:
+            SESSION_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+
+        session, cached_at = entry
+        age = time.monotonic() - cached_at
+        if age > self.ttl:
+            self._drop(user_id)
+            SESSION_CACHE_LOOKUPS.labels(result="expired").inc()
+            return None
+
+        self._entries.move_to_end(user_id)
+        SESSION_CACHE_LOOKUPS.labels(result="hit").inc()
+        SESSION_CACHE_HIT_AGE.observe(age)
+        return session.model_copy(update={"messages": list(session.messages)})
+
+    def token(self) -> int:
+        """Take before reading from Redis and hand to put()"""
+        return self._generation
+
+    def put(self, user_id: str, session: SessionData, token: int):
+        if not self.connected or token < self._floor or self._invalidated.get(user_id, -1) > token:
+            return
+        self._store(user_id, session)
+
+    async def write(self, redis, user_id: str, session: Optional[SessionData] = None):
+        """After a write: replace or drop the local entry and tell the other workers"""
+        self._invalidate(user_id, "local")
+        if session is not None and self.connected:
+            self._store(user_id, session)
+        try:
+            await redis.publish(self.channel, f"{self.worker_id} {time.time()} {user_id}")
+        except Exception as e:
+            logger.error("Failed to publish session invalidation", user_id=user_id, error=str(e))
+
+    def appended(self, user_id: str, messages: List[ChatMessage]) -> Optional[SessionData]:
+        """The cached session with messages appended, as add_messages leaves it in Redis"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        session = entry[0]
+        return session.model_copy(update={
+            "messages": (session.messages + messages)[-settings.max_session_messages:],
+            "last_active": datetime.now()
+        })
+
+    def clear(self):
+        self._entries.clear()
+        self._invalidated.clear()
+        self._generation += 1
+        self._floor = self._generation
+        SESSION_CACHE_ENTRIES.set(0)
+
+    def _store(self, user_id: str, session: SessionData):
+        self._entries[user_id] = (session, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        SESSION_CACHE_ENTRIES.set(len(self._entries))
+
+    def _drop(self, user_id: str):
+        self._entries.pop(user_id, None)
+        SESSION_CACHE_ENTRIES.set(len(self._entries))
+
+    def _invalidate(self, user_id: str, source: str):
+        self._generation += 1
+        self._invalidated[user_id] = self._generation
+        self._invalidated.move_to_end(user_id)
+        while len(self._invalidated) > self.max_entries:
+            _, generation = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, generation)
+        self._drop(user_id)
+        SESSION_CACHE_INVALIDATIONS.labels(source=source).inc()
+
+    def _on_message(self, data: str):
+        origin, sent_at, user_id = data.split(" ", 2)
+        if origin == self.worker_id:
+            return
+        self._invalidate(user_id, "remote")
+        SESSION_CACHE_INVALIDATION_LAG.observe(max(0.0, time.time() - float(sent_at)))
+
+    async def _listen(self):
+        """Follow invalidations from other workers, resubscribing after connection loss"""
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self.connected = True
+                    elif message["type"] == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Session invalidation feed lost", error=str(e))
+            finally:
+                # Anything cached may have missed invalidations while we were away
+                self.connected = False
+                self.clear()
+                if pubsub is not None:
+                    await pubsub.close()
+            await asyncio.sleep(1.0)
+
+    def start(self):
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+
+# Process-wide near-cache, active when session_cache_enabled is set
+session_cache = SessionNearCache(
+    max_entries=settings.session_cache_max_entries,
+    ttl=settings.session_cache_ttl,
+    channel=settings.session_cache_channel
+)
+
+def get_session_cache() -> Optional[SessionNearCache]:
+    return session_cache if settings.session_cache_enabled else None
+
+async def init_session_cache():
+    """Start following session invalidations when the near-cache is enabled"""
+    if settings.session_cache_enabled:
+        session_cache.start()
+
+async def close_session_cache():
+    await session_cache.stop()
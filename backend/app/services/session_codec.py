@@ -0,0 +1,126 @@
+from typing import Union
+from datetime import datetime
+import json
+import structlog
+
+from app.core.config import settings
+from app.schemas.chat import ChatMessage
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+logger = structlog.get_logger()
+
+# Every encoded message starts with one version byte: serializer in the high
+# nibble, compression in the low one. Entries written before the codec existed
+# are JSON objects and start with "{" (0x7b), which no version byte uses.
+SERIALIZERS = {"msgpack": 1, "orjson": 2, "json": 3}
+COMPRESSIONS = {"none": 0, "zstd": 1, "lz4": 2}
+LEGACY_JSON = ord("{")
+
+def _available(serializer: str, compression: str) -> bool:
+    return (
+        {"msgpack": msgpack, "orjson": orjson, "json": json}.get(serializer) is not None
+        and {"none": True, "zstd": zstandard, "lz4": lz4}.get(compression) is not None
+    )
+
+class SessionCodec:
+    """Encodes session messages as compact [role, content, epoch_ms] records"""
+
+    def __init__(
+        self,
+        serializer: str = None,
+        compression: str = None,
+        compression_threshold: int = None
+    ):
+        self.serializer = serializer or settings.session_codec
+        self.compression = compression or settings.session_compression
+        self.compression_threshold = (
+            settings.session_compression_threshold
+            if compression_threshold is None else compression_threshold
+        )
+        if not _available(self.serializer, self.compression):
+            logger.warning(
+                "Session codec unavailable, using json",
+                serializer=self.serializer,
+                compression=self.compression
+            )
+            self.serializer, self.compression = "json", "none"
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def encode_message(self, message: ChatMessage) -> bytes:
+        record = [message.role, message.content, int(message.timestamp.timestamp() * 1000)]
+        payload = self._serialize(record)
+
+        compression = "none"
+        if self.compression != "none" and len(payload) >= self.compression_threshold:
+            payload = self._compress(payload)
+            compression = self.compression
+
+        header = SERIALIZERS[self.serializer] << 4 | COMPRESSIONS[compression]
+        return bytes([header]) + payload
+
+    def decode_message(self, raw: Union[bytes, str]) -> ChatMessage:
+        """Decode any version, including legacy JSON entries"""
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+
+        if raw[0] == LEGACY_JSON:
+            data = json.loads(raw)
+            return ChatMessage(
+                role=data["role"],
+                content=data["content"],
+                timestamp=datetime.fromisoformat(data["timestamp"])
+            )
+
+        serializer, compression = raw[0] >> 4, raw[0] & 0x0F
+        payload = raw[1:]
+        if compression == COMPRESSIONS["zstd"]:
+            payload = self._zstd_decompressor.decompress(payload)
+        elif compression == COMPRESSIONS["lz4"]:
+            payload = lz4.frame.decompress(payload)
+
+        if serializer == SERIALIZERS["msgpack"]:
+            role, content, epoch_ms = msgpack.unpackb(payload)
+        elif serializer == SERIALIZERS["orjson"]:
+            role, content, epoch_ms = orjson.loads(payload)
+        elif serializer == SERIALIZERS["json"]:
+            role, content, epoch_ms = json.loads(payload)
+        else:
+            raise ValueError(f"Unknown session codec version byte {raw[0]:#x}")
+
+        return ChatMessage(
+            role=role,
+            content=content,
+            timestamp=datetime.fromtimestamp(epoch_ms / 1000)
+        )
+
+    def _serialize(self, record: list) -> bytes:
+        if self.serializer == "msgpack":
+            return msgpack.packb(record)
+        if self.serializer == "orjson":
+            return orjson.dumps(record)
+        return json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd_compressor.compress(payload)
+        return lz4.frame.compress(payload)
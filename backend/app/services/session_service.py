@@ -1,45 +1,166 @@
-from typing import Optional, List
-from datetime import datetime, timedelta
+from typing import Optional, List, Dict
+from datetime import datetime
 import json
 import structlog
+from redis.exceptions import WatchError
 
 from app.core.config import settings
 from app.schemas.chat import SessionData, ChatMessage
+from app.services.session_cache import get_session_cache
+from app.services.session_codec import SessionCodec
+from app.services.session_store import get_session_store
 
 logger = structlog.get_logger()
 
+# Sessions are a list of encoded messages (see session_codec) plus a metadata hash:
+#   session:{user_id}:messages  RPUSH'd messages, trimmed to max_session_messages
+#   session:{user_id}:meta      language, last_active, metadata (JSON), summary
+# Older deployments stored one JSON blob under session:{user_id}; it is folded
+# into the new layout the first time the session is touched.
+
+# KEYS: legacy blob, messages list, meta hash
+_MIGRATE_LUA = """
+local blob = redis.call('GET', KEYS[1])
+if blob then
+    local data = cjson.decode(blob)
+    if redis.call('EXISTS', KEYS[2]) == 0 and type(data.messages) == 'table' then
+        for _, message in ipairs(data.messages) do
+            redis.call('RPUSH', KEYS[2], cjson.encode(message))
+        end
+    end
+    if redis.call('EXISTS', KEYS[3]) == 0 then
+        local metadata = '{}'
+        if type(data.metadata) == 'table' and next(data.metadata) ~= nil then
+            metadata = cjson.encode(data.metadata)
+        end
+        redis.call('HSET', KEYS[3],
+            'language', data.language or 'en',
+            'last_active', data.last_active or '',
+            'metadata', metadata)
+        if type(data.summary) == 'string' then
+            redis.call('HSET', KEYS[3], 'summary', data.summary)
+        end
+    end
+    local ttl = redis.call('TTL', KEYS[1])
+    if ttl > 0 then
+        redis.call('EXPIRE', KEYS[2], ttl)
+        redis.call('EXPIRE', KEYS[3], ttl)
+    end
+    redis.call('DEL', KEYS[1])
+end
+"""
+
+# Migrated messages stay JSON objects; the codec still decodes them.
+
+# ARGV: max messages, ttl, last_active, default language, then one or more encoded messages
+_APPEND_LUA = _MIGRATE_LUA + """
+redis.call('RPUSH', KEYS[2], unpack(ARGV, 5))
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[1]), -1)
+redis.call('HSET', KEYS[3], 'last_active', ARGV[3])
+redis.call('HSETNX', KEYS[3], 'language', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return redis.call('LLEN', KEYS[2])
+"""
+
+# Restores a session read back from PostgreSQL unless it was recreated meanwhile
+# KEYS: messages list, meta hash
+# ARGV: ttl, language, last_active, metadata JSON, summary, then encoded messages
+_RESTORE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 or redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+if #ARGV > 5 then
+    redis.call('RPUSH', KEYS[1], unpack(ARGV, 6))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+redis.call('HSET', KEYS[2], 'language', ARGV[2], 'last_active', ARGV[3], 'metadata', ARGV[4])
+if ARGV[5] ~= '' then
+    redis.call('HSET', KEYS[2], 'summary', ARGV[5])
+end
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+def _keys(user_id: str) -> List[str]:
+    return [f"session:{user_id}", f"session:{user_id}:messages", f"session:{user_id}:meta"]
+
+class SessionTurn:
+    """In-memory view of a session for one chat turn, written back in a single call"""
+
+    def __init__(self, service: "SessionService", user_id: str, session: Optional[SessionData]):
+        self.service = service
+        self.user_id = user_id
+        self.stored: List[ChatMessage] = session.messages if session else []
+        self.summary: Optional[str] = session.summary if session else None
+        self.language: str = session.language if session else "en"
+        self.pending: List[ChatMessage] = []
+
+    @property
+    def messages(self) -> List[ChatMessage]:
+        """Stored history plus this turn's messages, as they will read after commit"""
+        return (self.stored + self.pending)[-settings.max_session_messages:]
+
+    def add(self, message: ChatMessage):
+        self.pending.append(message)
+
+    async def commit(self):
+        """Append this turn's messages in one atomic write"""
+        if self.pending:
+            await self.service.add_messages(self.user_id, self.pending)
+            self.stored, self.pending = self.messages, []
+
+    def snapshot(self) -> SessionData:
+        return SessionData(
+            user_id=self.user_id,
+            messages=self.messages,
+            language=self.language,
+            last_active=datetime.now(),
+            summary=self.summary
+        )
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
 class SessionService:
-    def __init__(self, redis):
+    def __init__(self, redis, codec: Optional[SessionCodec] = None):
+        # Messages are binary, so this must be a client without decode_responses
         self.redis = redis
+        self.codec = codec or SessionCodec()
+        self.cache = get_session_cache()
+        self.store = get_session_store()
+        self._migrate = redis.register_script(_MIGRATE_LUA)
+        self._append = redis.register_script(_APPEND_LUA)
+        self._restore = redis.register_script(_RESTORE_LUA)
 
-    async def get_session(self, user_id: str) -> Optional[SessionData]:
-        """Get user session data from Redis"""
+    async def get_session(self, user_id: str, read_through: bool = True) -> Optional[SessionData]:
+        """Get user session data from Redis, falling back to the PostgreSQL copy"""
         try:
-            session_key = f"session:{user_id}"
-            session_data = await self.redis.get(session_key)
-            
-            if not session_data:
+            if self.cache:
+                cached = self.cache.get(user_id)
+                if cached:
+                    return cached
+                token = self.cache.token()
+
+            meta, raw_messages = await self._read(user_id, 0)
+
+            if not meta:
+                if read_through and self.store:
+                    return await self._read_through(user_id)
                 return None
-                
-            data = json.loads(session_data)
-            
-            # Convert message timestamps back to datetime objects
-            messages = []
-            for msg_data in data.get("messages", []):
-                messages.append(ChatMessage(
-                    role=msg_data["role"],
-                    content=msg_data["content"],
-                    timestamp=datetime.fromisoformat(msg_data["timestamp"])
-                ))
-            
-            return SessionData(
+
+            session = SessionData(
                 user_id=user_id,
-                messages=messages,
-                language=data.get("language", "en"),
-                last_active=datetime.fromisoformat(data["last_active"]),
-                metadata=data.get("metadata", {})
+                messages=[self._decode_message(raw) for raw in raw_messages],
+                language=meta.get("language", "en"),
+                last_active=datetime.fromisoformat(meta["last_active"]) if meta.get("last_active") else datetime.now(),
+                metadata=json.loads(meta.get("metadata") or "{}"),
+                summary=meta.get("summary")
             )
-            
+            if self.cache:
+                self.cache.put(user_id, session, token)
+            return session
+
         except Exception as e:
             logger.error("Failed to get session", user_id=user_id, error=str(e))
             return None
@@ -53,72 +174,149 @@ class SessionService:
             last_active=datetime.now(),
             metadata={}
         )
-        
-        await self._save_session(session_data)
+
+        try:
+            _, _, meta_key = _keys(user_id)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(meta_key, mapping={
+                    "language": language,
+                    "last_active": session_data.last_active.isoformat(),
+                    "metadata": "{}"
+                })
+                pipe.expire(meta_key, settings.session_ttl)
+                await pipe.execute()
+            if self.cache:
+                await self.cache.write(self.redis, user_id, session_data)
+            if self.store:
+                self.store.mark_dirty(user_id)
+        except Exception as e:
+            logger.error("Failed to create session", user_id=user_id, error=str(e))
+
         return session_data
 
+    async def begin_turn(self, user_id: str) -> SessionTurn:
+        """Load the session once for a chat turn"""
+        return SessionTurn(self, user_id, await self.get_session(user_id))
+
     async def add_message(self, user_id: str, message: ChatMessage):
         """Add a message to the session"""
-        session_data = await self.get_session(user_id)
-        
-        if not session_data:
-            session_data = await self.create_session(user_id)
-        
-        # Add message
-        session_data.messages.append(message)
-        session_data.last_active = datetime.now()
-        
-        # Trim messages if too many
-        if len(session_data.messages) > settings.max_session_messages:
-            session_data.messages = session_data.messages[-settings.max_session_messages:]
-        
-        await self._save_session(session_data)
+        await self.add_messages(user_id, [message])
+
+    async def add_messages(self, user_id: str, messages: List[ChatMessage]):
+        """Append messages, trimming the history and refreshing the TTL atomically"""
+        try:
+            await self._append(
+                keys=_keys(user_id),
+                args=[
+                    settings.max_session_messages,
+                    settings.session_ttl,
+                    datetime.now().isoformat(),
+                    "en",
+                    *[self._encode_message(message) for message in messages]
+                ]
+            )
+            if self.cache:
+                await self.cache.write(self.redis, user_id, self.cache.appended(user_id, messages))
+            if self.store:
+                self.store.mark_dirty(user_id)
+        except Exception as e:
+            logger.error("Failed to save session", user_id=user_id, error=str(e))
 
     async def get_conversation_context(self, user_id: str, max_messages: int = 10) -> List[ChatMessage]:
         """Get conversation context for LLM"""
-        session_data = await self.get_session(user_id)
-        
-        if not session_data:
+        try:
+            cached = self.cache.get(user_id) if self.cache else None
+            if cached:
+                return cached.messages[-max_messages:]
+            _, raw_messages = await self._read(user_id, max_messages)
+            return [self._decode_message(raw) for raw in raw_messages]
+        except Exception as e:
+            logger.error("Failed to get conversation context", user_id=user_id, error=str(e))
             return []
-        
-        # Return last N messages
-        return session_data.messages[-max_messages:]
+
+    async def apply_summary(self, user_id: str, summary: str, until: datetime):
+        """Replace messages up to and including until with a rolling summary"""
+        _, messages_key, meta_key = _keys(user_id)
+        # Optimistic transaction, so messages appended while the summary was generated are kept
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(messages_key)
+                    drop = 0
+                    for raw in await pipe.lrange(messages_key, 0, -1):
+                        if self.codec.decode_message(raw).timestamp > until:
+                            break
+                        drop += 1
+                    pipe.multi()
+                    if drop:
+                        pipe.ltrim(messages_key, drop, -1)
+                    pipe.hset(meta_key, "summary", summary)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    continue
+        if self.cache:
+            await self.cache.write(self.redis, user_id)
+        if self.store:
+            self.store.mark_dirty(user_id)
 
     async def clear_session(self, user_id: str):
         """Clear user session"""
         try:
-            session_key = f"session:{user_id}"
-            await self.redis.delete(session_key)
+            # Drop the persisted copy first so no read-through can restore what we clear
+            if self.store:
+                await self.store.delete(user_id)
+            await self.redis.delete(*_keys(user_id))
+            if self.cache:
+                await self.cache.write(self.redis, user_id)
             logger.info("Session cleared", user_id=user_id)
         except Exception as e:
             logger.error("Failed to clear session", user_id=user_id, error=str(e))
 
-    async def _save_session(self, session_data: SessionData):
-        """Save session data to Redis"""
-        try:
-            session_key = f"session:{session_data.user_id}"
-            
-            # Convert to JSON-serializable format
-            data = {
-                "messages": [
-                    {
-                        "role": msg.role,
-                        "content": msg.content,
-                        "timestamp": msg.timestamp.isoformat()
-                    }
-                    for msg in session_data.messages
-                ],
-                "language": session_data.language,
-                "last_active": session_data.last_active.isoformat(),
-                "metadata": session_data.metadata or {}
-            }
-            
-            # Save with TTL
-            await self.redis.setex(
-                session_key,
+    async def _read(self, user_id: str, tail: int):
+        """Metadata hash and the last tail messages (all when tail is 0)"""
+        legacy_key, messages_key, meta_key = _keys(user_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(legacy_key)
+            pipe.hgetall(meta_key)
+            pipe.lrange(messages_key, -tail if tail else 0, -1)
+            legacy, meta, raw_messages = await pipe.execute()
+
+        if legacy:
+            await self._migrate(keys=[legacy_key, messages_key, meta_key])
+            return await self._read(user_id, tail)
+
+        meta: Dict[str, str] = {_text(k): _text(v) for k, v in meta.items()}
+        return meta, raw_messages
+
+    async def _read_through(self, user_id: str) -> Optional[SessionData]:
+        """Bring a session evicted from Redis back from PostgreSQL"""
+        session = await self.store.load(user_id)
+        if session is None:
+            return None
+
+        # Keep the window a fresh Redis session would hold
+        session.messages = session.messages[-settings.max_session_messages:]
+        _, messages_key, meta_key = _keys(user_id)
+        restored = await self._restore(
+            keys=[messages_key, meta_key],
+            args=[
                 settings.session_ttl,
-                json.dumps(data)
-            )
-            
-        except Exception as e:
-            logger.error("Failed to save session", user_id=session_data.user_id, error=str(e))
+                session.language,
+                session.last_active.isoformat(),
+                json.dumps(session.metadata),
+                session.summary or "",
+                *[self._encode_message(message) for message in session.messages]
+            ]
+        )
+        if not restored:
+            # Recreated by a concurrent turn; that copy is newer
+            return await self.get_session(user_id, read_through=False)
+        logger.info("Session restored from PostgreSQL", user_id=user_id, messages=len(session.messages))
+        return session
+
+    def _encode_message(self, message: ChatMessage) -> bytes:
+        return self.codec.encode_message(message)
+
+    def _decode_message(self, raw: bytes) -> ChatMessage:
+        return self.codec.decode_message(raw)
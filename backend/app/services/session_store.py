@@ -0,0 +1,201 @@
+from typing import Dict, List, Optional
+from collections import OrderedDict
+import asyncio
+import time
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis import get_redis_bytes
+from app.models.database import Session
+from app.schemas.chat import SessionData
+
+logger = structlog.get_logger()
+
+SESSION_PERSIST_ROWS = Counter(
+    "chatbot_session_persist_rows_total",
+    "Sessions written to or removed from PostgreSQL by the write-behind flusher",
+    ["result"]
+)
+SESSION_PERSIST_PENDING = Gauge(
+    "chatbot_session_persist_pending",
+    "Sessions waiting to be flushed to PostgreSQL"
+)
+SESSION_PERSIST_FLUSH_SECONDS = Histogram(
+    "chatbot_session_persist_flush_seconds",
+    "Duration of one write-behind flush batch",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+SESSION_READ_THROUGH = Counter(
+    "chatbot_session_read_through_total",
+    "PostgreSQL lookups for sessions missing from Redis",
+    ["result"]
+)
+
+class SessionStore:
+    """Write-behind copy of Redis sessions in PostgreSQL, with read-through on a Redis miss"""
+
+    def __init__(self, interval: float, batch_size: int, max_pending: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        # user_id -> True when the session was cleared; the state itself is read from
+        # Redis at flush time, so only ids are held and repeated writes coalesce
+        self._dirty: "OrderedDict[str, bool]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, user_id: str, cleared: bool = False):
+        self._dirty[user_id] = cleared
+        self._dirty.move_to_end(user_id)
+        while len(self._dirty) > self.max_pending:
+            self._dirty.popitem(last=False)
+            SESSION_PERSIST_ROWS.labels(result="dropped").inc()
+        if len(self._dirty) >= self.batch_size:
+            self._wakeup.set()
+        SESSION_PERSIST_PENDING.set(len(self._dirty))
+
+    async def delete(self, user_id: str):
+        """Remove a cleared session's row now rather than at the next flush"""
+        # Also queued, so the next flush removes it again if an in-flight one rewrote it
+        self.mark_dirty(user_id, cleared=True)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(Session).where(Session.user_id == user_id))
+                await db.commit()
+            SESSION_PERSIST_ROWS.labels(result="deleted").inc()
+        except Exception as e:
+            logger.error("Failed to delete persisted session", user_id=user_id, error=str(e))
+
+    async def load(self, user_id: str) -> Optional[SessionData]:
+        """Last persisted copy of a session"""
+        try:
+            async with AsyncSessionLocal() as db:
+                row = await db.get(Session, user_id)
+            if row is None or not row.session_data:
+                SESSION_READ_THROUGH.labels(result="miss").inc()
+                return None
+            SESSION_READ_THROUGH.labels(result="hit").inc()
+            return SessionData.model_validate(row.session_data)
+        except Exception as e:
+            SESSION_READ_THROUGH.labels(result="error").inc()
+            logger.error("Failed to load persisted session", user_id=user_id, error=str(e))
+            return None
+
+    async def flush(self):
+        """Persist everything marked so far, one batch at a time"""
+        while self._dirty:
+            batch: Dict[str, bool] = {}
+            while self._dirty and len(batch) < self.batch_size:
+                user_id, cleared = self._dirty.popitem(last=False)
+                batch[user_id] = cleared
+            SESSION_PERSIST_PENDING.set(len(self._dirty))
+
+            start = time.perf_counter()
+            try:
+                await self._write_batch(batch)
+            except asyncio.CancelledError:
+                self._requeue(batch)
+                raise
+            except Exception as e:
+                logger.error("Session flush failed", sessions=len(batch), error=str(e))
+                SESSION_PERSIST_ROWS.labels(result="error").inc(len(batch))
+                self._requeue(batch)
+                return
+            finally:
+                SESSION_PERSIST_FLUSH_SECONDS.observe(time.perf_counter() - start)
+
+    def _requeue(self, batch: Dict[str, bool]):
+        """Retry next round, unless the session was marked again meanwhile"""
+        for user_id, cleared in batch.items():
+            if user_id not in self._dirty and len(self._dirty) < self.max_pending:
+                self._dirty[user_id] = cleared
+        SESSION_PERSIST_PENDING.set(len(self._dirty))
+
+    async def _write_batch(self, batch: Dict[str, bool]):
+        from app.services.session_service import SessionService
+
+        cleared = [user_id for user_id, was_cleared in batch.items() if was_cleared]
+        live = [user_id for user_id, was_cleared in batch.items() if not was_cleared]
+
+        # Read the current state from Redis only; a read-through here would resurrect
+        # sessions that have since expired
+        session_service = SessionService(get_redis_bytes())
+        sessions: List[SessionData] = [
+            session for session in await asyncio.gather(
+                *[session_service.get_session(user_id, read_through=False) for user_id in live]
+            ) if session is not None
+        ]
+
+        async with AsyncSessionLocal() as db:
+            if sessions:
+                stmt = insert(Session).values([
+                    {
+                        "user_id": session.user_id,
+                        "last_active_at": session.last_active,
+                        "language": session.language,
+                        "session_data": session.model_dump(mode="json")
+                    }
+                    for session in sessions
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Session.user_id],
+                    set_={
+                        "last_active_at": stmt.excluded.last_active_at,
+                        "language": stmt.excluded.language,
+                        "session_data": stmt.excluded.session_data
+                    }
+                )
+                await db.execute(stmt)
+            if cleared:
+                await db.execute(delete(Session).where(Session.user_id.in_(cleared)))
+            await db.commit()
+
+        SESSION_PERSIST_ROWS.labels(result="upserted").inc(len(sessions))
+        SESSION_PERSIST_ROWS.labels(result="deleted").inc(len(cleared))
+        SESSION_PERSIST_ROWS.labels(result="expired").inc(len(live) - len(sessions))
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        # Final flush so a clean shutdown doesn't lose recent turns
+        await self.flush()
+
+# Process-wide flusher, active when session_persist_enabled is set
+session_store = SessionStore(
+    interval=settings.session_persist_interval,
+    batch_size=settings.session_persist_batch_size,
+    max_pending=settings.session_persist_max_pending
+)
+
+def get_session_store() -> Optional[SessionStore]:
+    return session_store if settings.session_persist_enabled else None
+
+async def init_session_store():
+    """Start the write-behind flusher when session persistence is enabled"""
+    if settings.session_persist_enabled:
+        session_store.start()
+
+async def close_session_store():
+    if settings.session_persist_enabled:
+        await session_store.stop()
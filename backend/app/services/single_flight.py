@@ -0,0 +1,113 @@
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import json
+import time
+import uuid
+import structlog
+from prometheus_client import Counter
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "chatbot_single_flight_calls_total",
+    "Coalesced calls by kind and role (leader runs the call, followers share its result)",
+    ["kind", "role"]
+)
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one in-flight call"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._calls: Dict[str, _Call] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], redis=None) -> Any:
+        """Run fn once per key across concurrent callers, optionally across workers via Redis"""
+        if not settings.single_flight_enabled:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(self._lead(key, fn, redis)))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            SINGLE_FLIGHT_CALLS.labels(kind=self.kind, role="leader").inc()
+        else:
+            SINGLE_FLIGHT_CALLS.labels(kind=self.kind, role="follower").inc()
+
+        call.waiters += 1
+        try:
+            # Shielded so one caller going away doesn't cancel the call for the others
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def _lead(self, key: str, fn: Callable[[], Awaitable[Any]], redis) -> Any:
+        if redis is None or not settings.single_flight_redis:
+            return await fn()
+
+        # The lock holds a per-call token and the result is stored under it, so only
+        # callers that overlapped this call can read it back
+        lock_key = f"single_flight:{self.kind}:lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await redis.set(
+                lock_key, token, nx=True, px=int(settings.single_flight_lock_ttl * 1000)
+            )
+            if not acquired:
+                token = await redis.get(lock_key)
+        except Exception as e:
+            logger.warning("Single-flight lock failed", kind=self.kind, error=str(e))
+            return await fn()
+
+        result_key = f"single_flight:{self.kind}:result:{key}:{token}"
+        if acquired:
+            try:
+                result = await fn()
+                try:
+                    await redis.set(result_key, json.dumps(result), ex=settings.single_flight_result_ttl)
+                except Exception as e:
+                    logger.warning("Single-flight result store failed", kind=self.kind, error=str(e))
+                return result
+            finally:
+                try:
+                    await redis.delete(lock_key)
+                except Exception:
+                    pass
+
+        if token is None:
+            # The other call finished between our two commands
+            return await fn()
+
+        # Another worker holds the lock; wait for its result, or run it ourselves if it gives up
+        deadline = time.monotonic() + settings.single_flight_lock_ttl
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.single_flight_poll_interval)
+                shared = await redis.get(result_key)
+                if shared is None and await redis.get(lock_key) != token:
+                    # Released; the result may have landed just before
+                    shared = await redis.get(result_key)
+                    if shared is None:
+                        break
+                if shared is not None:
+                    SINGLE_FLIGHT_CALLS.labels(kind=self.kind, role="remote_follower").inc()
+                    return json.loads(shared)
+        except Exception as e:
+            logger.warning("Single-flight wait failed", kind=self.kind, error=str(e))
+        return await fn()
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional
+import structlog
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.core.redis import get_redis_bytes
+from app.schemas.chat import ChatMessage, SessionData
+from app.services.llm_limiter import BACKGROUND_PRIORITY, set_request_priority
+from app.services.llm_router import llm_router
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+
+SUMMARIZATION_RUNS = Counter(
+    "chatbot_summarization_runs_total",
+    "Background conversation summary passes by result",
+    ["result"]
+)
+
+SUMMARY_PROMPTS = {
+    "en": "Summarize the earlier part of this customer service conversation in a few sentences. "
+          "Keep names, order details, preferences and any unresolved questions. "
+          "Merge it with the previous summary if there is one.",
+    "id": "Ringkas bagian awal percakapan layanan pelanggan ini dalam beberapa kalimat. "
+          "Pertahankan nama, detail pesanan, preferensi, dan pertanyaan yang belum terjawab. "
+          "Gabungkan dengan ringkasan sebelumnya jika ada."
+}
+
+class ConversationSummarizer:
+    """Folds older session turns into a rolling summary"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.session_service = SessionService(get_redis_bytes())
+
+    async def maybe_summarize(self, user_id: str, language: str = "en", session: Optional[SessionData] = None):
+        """Compact older turns once enough of them have piled up behind the recent window"""
+        if not settings.summary_enabled or not llm_router.available():
+            return
+
+        # Callers that just wrote the session pass their view to save a read
+        if session is None:
+            session = await self.session_service.get_session(user_id)
+        if not session:
+            return
+        older = session.messages[:-settings.summary_keep_recent_messages]
+        if len(older) < settings.summary_batch_messages:
+            return
+
+        # One pass per user at a time, across workers
+        lock_key = f"session:{user_id}:summary_lock"
+        if not await self.redis.set(lock_key, "1", nx=True, ex=settings.summary_lock_ttl):
+            SUMMARIZATION_RUNS.labels(result="locked").inc()
+            return
+
+        try:
+            # Summaries yield to live replies when providers are saturated
+            set_request_priority(BACKGROUND_PRIORITY)
+            summary = await llm_router.complete(
+                self._build_messages(session.summary, older, language),
+                stage="summary",
+                max_tokens=settings.summary_max_tokens,
+                temperature=0.2
+            )
+            await self.session_service.apply_summary(user_id, summary, older[-1].timestamp)
+            SUMMARIZATION_RUNS.labels(result="success").inc()
+            logger.info("Conversation summarized", user_id=user_id, compacted=len(older))
+        except Exception as e:
+            SUMMARIZATION_RUNS.labels(result="error").inc()
+            logger.error("Conversation summarization failed", user_id=user_id, error=str(e))
+        finally:
+            await self.redis.delete(lock_key)
+
+    def _build_messages(
+        self, previous: Optional[str], messages: List[ChatMessage], language: str
+    ) -> List[Dict[str, str]]:
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        if previous:
+            transcript = f"Previous summary: {previous}\n\n{transcript}"
+        return [
+            {"role": "system", "content": SUMMARY_PROMPTS.get(language, SUMMARY_PROMPTS["en"])},
+            {"role": "user", "content": transcript}
+        ]
@@ -0,0 +1,104 @@
+from typing import List, Optional, Set
+from contextvars import ContextVar
+from dataclasses import dataclass
+import structlog
+from prometheus_client import Counter, Histogram
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+MODEL_TOKENS = Counter(
+    "chatbot_model_tokens_total",
+    "Tokens sent to and generated by model calls",
+    ["provider", "model", "stage", "channel", "kind"]
+)
+MODEL_COST_CENTS = Counter(
+    "chatbot_model_cost_cents_total",
+    "Estimated model spend in US cents",
+    ["provider", "model", "stage", "channel"]
+)
+MODEL_CALL_SECONDS = Histogram(
+    "chatbot_model_call_seconds",
+    "Latency of model calls by pipeline stage",
+    ["provider", "model", "stage", "channel"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+)
+
+@dataclass
+class UsageRecord:
+    provider: str
+    model: str
+    stage: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost_cents: float
+
+class UsageTracker:
+    """Token usage and cost of the model calls made while handling one message"""
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.records: List[UsageRecord] = []
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(r.prompt_tokens for r in self.records if r.stage != "embedding")
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(r.completion_tokens for r in self.records)
+
+    @property
+    def embedding_tokens(self) -> int:
+        return sum(r.prompt_tokens for r in self.records if r.stage == "embedding")
+
+    @property
+    def cost_cents(self) -> float:
+        return sum(r.cost_cents for r in self.records)
+
+# Providers that run in-process and cost nothing
+FREE_PROVIDERS = {"local", "mock"}
+
+_unpriced_models: Set[str] = set()
+
+_current_usage: ContextVar[Optional[UsageTracker]] = ContextVar("current_usage", default=None)
+
+def track_usage(channel: str) -> UsageTracker:
+    """Start attributing model calls in the current context (and tasks it spawns) to a tracker"""
+    tracker = UsageTracker(channel)
+    _current_usage.set(tracker)
+    return tracker
+
+def price_cents(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Cost of a call from the per-million-token price table; unknown models cost nothing"""
+    prices = settings.llm_prices.get(model)
+    if not prices:
+        return 0.0
+    prompt_price, completion_price = prices
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+def record_usage(
+    provider: str,
+    model: str,
+    stage: str,
+    prompt_tokens: int,
+    completion_tokens: int = 0,
+    latency: Optional[float] = None
+):
+    """Record one model call against the current tracker and in Prometheus"""
+    cost = price_cents(model, prompt_tokens, completion_tokens)
+    if provider not in FREE_PROVIDERS and model not in settings.llm_prices and model not in _unpriced_models:
+        _unpriced_models.add(model)
+        logger.warning("No price configured for model; its usage is recorded at zero cost", provider=provider, model=model)
+    tracker = _current_usage.get()
+    channel = tracker.channel if tracker else "none"
+    if tracker is not None:
+        tracker.records.append(UsageRecord(provider, model, stage, prompt_tokens, completion_tokens, cost))
+
+    MODEL_TOKENS.labels(provider=provider, model=model, stage=stage, channel=channel, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        MODEL_TOKENS.labels(provider=provider, model=model, stage=stage, channel=channel, kind="completion").inc(completion_tokens)
+    MODEL_COST_CENTS.labels(provider=provider, model=model, stage=stage, channel=channel).inc(cost)
+    if latency is not None:
+        MODEL_CALL_SECONDS.labels(provider=provider, model=model, stage=stage, channel=channel).observe(latency)
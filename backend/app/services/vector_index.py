@@ -0,0 +1,234 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import glob
+import json
+import os
+import structlog
+import numpy as np
+
+from app.core.config import settings
+from app.core.qdrant import get_qdrant
+from app.core.redis import get_redis
+from app.services.kb_version import get_kb_version
+
+logger = structlog.get_logger()
+
+class _VectorPartition:
+    """Contiguous vector matrix for one (language, status) partition"""
+
+    def __init__(self, matrix: np.ndarray, scales: Optional[np.ndarray], payloads: List[Dict[str, Any]]):
+        self.matrix = matrix  # float32 (n, d), or int8 (n, d) when scales is set
+        self.scales = scales  # float32 (n,) dequantization scale per row
+        self.payloads = payloads
+
+    @classmethod
+    def from_vectors(cls, vectors: List[List[float]], payloads: List[Dict[str, Any]], quantization: str):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+
+        if quantization != "int8":
+            return cls(np.ascontiguousarray(matrix), None, payloads)
+
+        scales = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return cls(np.ascontiguousarray(quantized), scales.astype(np.float32), payloads)
+
+    def search(self, query: np.ndarray, limit: int) -> List[Tuple[float, Dict[str, Any]]]:
+        count = self.matrix.shape[0]
+        if count == 0:
+            return []
+
+        scores = self.matrix @ query
+        if self.scales is not None:
+            scores = scores * self.scales
+
+        limit = min(limit, count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.payloads[i]) for i in top]
+
+class LocalVectorIndex:
+    """In-process cosine top-k over a snapshot of the Qdrant collection"""
+
+    def __init__(self, snapshot_dir: str, quantization: str):
+        self.snapshot_dir = snapshot_dir
+        self.quantization = quantization
+        self.version: Optional[int] = None
+        self._partitions: Dict[Tuple[str, str], _VectorPartition] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.version is not None
+
+    def search(
+        self,
+        embedding: List[float],
+        language: str,
+        limit: int,
+        status: str = "active"
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        partition = self._partitions.get((language, status))
+        if partition is None:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        return partition.search(query, limit)
+
+    async def refresh(self):
+        """Load the snapshot for the current KB version, building it if missing"""
+        redis = await get_redis()
+        version = await get_kb_version(redis)
+        if version == self.version:
+            return
+
+        loop = asyncio.get_running_loop()
+        loaded = await loop.run_in_executor(None, self._load_snapshot, version)
+        if not loaded:
+            grouped = await self._scroll_qdrant()
+            await loop.run_in_executor(None, self._write_snapshot, version, grouped)
+            await loop.run_in_executor(None, self._load_snapshot, version)
+
+        logger.info(
+            "Local vector index loaded",
+            version=version,
+            partitions=len(self._partitions),
+            built=not loaded
+        )
+
+    async def _scroll_qdrant(self) -> Dict[Tuple[str, str], Tuple[List, List]]:
+        """Read every point from Qdrant, the source of truth, grouped by partition"""
+        qdrant = get_qdrant()
+        grouped: Dict[Tuple[str, str], Tuple[List, List]] = {}
+        offset = None
+        while True:
+            records, offset = await qdrant.scroll(
+                collection_name=settings.qdrant_collection,
+                limit=settings.qdrant_upsert_batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            for record in records:
+                key = (record.payload.get("language", ""), record.payload.get("status", ""))
+                vectors, payloads = grouped.setdefault(key, ([], []))
+                vectors.append(record.vector)
+                payloads.append(record.payload)
+            if offset is None:
+                break
+        return grouped
+
+    def _snapshot_path(self, version: int, name: str) -> str:
+        return os.path.join(self.snapshot_dir, f"kb-v{version}-{name}")
+
+    def _write_snapshot(self, version: int, grouped: Dict[Tuple[str, str], Tuple[List, List]]):
+        """Write matrices as .npy files plus a manifest; each file lands atomically"""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        manifest = {"version": version, "quantization": self.quantization, "partitions": []}
+
+        for index, ((language, status), (vectors, payloads)) in enumerate(grouped.items()):
+            partition = _VectorPartition.from_vectors(vectors, payloads, self.quantization)
+            entry = {
+                "language": language,
+                "status": status,
+                "matrix": f"p{index}-matrix.npy",
+                "scales": f"p{index}-scales.npy" if partition.scales is not None else None,
+                "payloads": payloads
+            }
+            self._atomic_save(self._snapshot_path(version, entry["matrix"]), partition.matrix)
+            if partition.scales is not None:
+                self._atomic_save(self._snapshot_path(version, entry["scales"]), partition.scales)
+            manifest["partitions"].append(entry)
+
+        # The manifest is written last, so its presence marks a complete snapshot
+        manifest_path = self._snapshot_path(version, "manifest.json")
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+        self._remove_old_snapshots(version)
+
+    def _atomic_save(self, path: str, array: np.ndarray):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def _load_snapshot(self, version: int) -> bool:
+        """Memory-map a snapshot so workers on this host share its pages"""
+        manifest_path = self._snapshot_path(version, "manifest.json")
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+
+        if manifest.get("quantization") != self.quantization:
+            return False
+
+        partitions = {}
+        for entry in manifest["partitions"]:
+            matrix = np.load(self._snapshot_path(version, entry["matrix"]), mmap_mode="r")
+            scales = None
+            if entry["scales"]:
+                scales = np.load(self._snapshot_path(version, entry["scales"]), mmap_mode="r")
+            partitions[(entry["language"], entry["status"])] = _VectorPartition(
+                matrix, scales, entry["payloads"]
+            )
+
+        self._partitions = partitions
+        self.version = version
+        return True
+
+    def _remove_old_snapshots(self, version: int):
+        # Open memory maps stay valid after unlink, so readers are unaffected
+        for path in glob.glob(os.path.join(self.snapshot_dir, "kb-v*-*")):
+            try:
+                file_version = int(os.path.basename(path).split("-")[1][1:])
+            except (IndexError, ValueError):
+                continue
+            if file_version < version:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def _refresh_loop(self):
+        """Follow KB changes so the index stays in sync with Qdrant"""
+        while True:
+            await asyncio.sleep(settings.local_vector_refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Local vector index refresh failed", error=str(e))
+
+    def start_refresh(self):
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+# Process-wide index, loaded at startup when the local vector backend is enabled
+vector_index = LocalVectorIndex(
+    snapshot_dir=settings.local_vector_snapshot_dir,
+    quantization=settings.local_vector_quantization
+)
+
+async def init_vector_index():
+    """Load or build the local vector index when it is the configured backend"""
+    if settings.vector_search_backend != "local":
+        return
+    await vector_index.refresh()
+    vector_index.start_refresh()
+
+async def close_vector_index():
+    await vector_index.stop_refresh()
@@ -0,0 +1,77 @@
+"""Compare session codecs: encode/decode time and stored bytes per session.
+
+Run from backend/: python -m benchmarks.session_codec_bench
+"""
+from datetime import datetime, timedelta
+import json
+import time
+
+from app.core.config import settings
+from app.schemas.chat import ChatMessage
+from app.services.session_codec import SessionCodec, _available
+
+ROUNDS = 2000
+
+SAMPLE_TURNS = [
+    ("user", "Halo, pesanan saya dengan nomor INV-2024-118273 belum sampai, bisa dicek?"),
+    ("assistant", "Tentu! Pesanan INV-2024-118273 sedang dalam pengiriman dan diperkirakan tiba "
+                  "dalam 2-3 hari kerja. Anda bisa melacaknya di halaman Pesanan Saya. "
+                  "Ada lagi yang bisa saya bantu?"),
+    ("user", "What is your refund policy if the item arrives damaged?"),
+    ("assistant", "If an item arrives damaged, send us a photo within 7 days of delivery and we "
+                  "will arrange a free replacement or a full refund to your original payment "
+                  "method. Refunds usually take 3-5 business days to appear. " * 2),
+]
+
+def build_session() -> list:
+    start = datetime.now() - timedelta(hours=1)
+    messages = []
+    for i in range(settings.max_session_messages):
+        role, content = SAMPLE_TURNS[i % len(SAMPLE_TURNS)]
+        messages.append(ChatMessage(role=role, content=content, timestamp=start + timedelta(seconds=30 * i)))
+    return messages
+
+def legacy_encode(message: ChatMessage) -> bytes:
+    """The pre-codec format, for reference"""
+    return json.dumps({
+        "role": message.role,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat()
+    }).encode("utf-8")
+
+def measure(name: str, encode, decode, messages: list):
+    encoded = [encode(m) for m in messages]
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for m in messages:
+            encode(m)
+    encode_us = (time.perf_counter() - start) / ROUNDS * 1e6
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for raw in encoded:
+            decode(raw)
+    decode_us = (time.perf_counter() - start) / ROUNDS * 1e6
+
+    size = sum(len(raw) for raw in encoded)
+    print(f"{name:<16} {size:>8} {encode_us:>12.1f} {decode_us:>12.1f}")
+
+def main():
+    messages = build_session()
+    print(f"{len(messages)} messages per session, {ROUNDS} rounds")
+    print(f"{'codec':<16} {'bytes':>8} {'encode_us':>12} {'decode_us':>12}")
+
+    reference = SessionCodec("json", "none")
+    measure("legacy-json", legacy_encode, reference.decode_message, messages)
+    for serializer in ("json", "orjson", "msgpack"):
+        for compression in ("none", "zstd", "lz4"):
+            if not _available(serializer, compression):
+                print(f"{serializer}+{compression}: not installed")
+                continue
+            # Chat messages are mostly below the production threshold; compress all of them
+            # here so the compressed rows show what zstd and lz4 actually do
+            codec = SessionCodec(serializer, compression, 0)
+            measure(f"{serializer}+{compression}", codec.encode_message, codec.decode_message, messages)
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,16 @@ import structlog
 from app.core.config import settings
 from app.core.database import init_db
 from app.core.redis import init_redis
-from app.core.qdrant import init_qdrant
-from app.api.routes import health, chat, knowledge_base, webhook
+from app.core.qdrant import init_qdrant, close_qdrant
+from app.core.embeddings import init_embeddings, close_embeddings
+from app.core.llm import init_llm, close_llm
+from app.core.background import close_background
+from app.services.embedding_service import verify_embedding_dimension
+from app.services.bm25_index import init_bm25_index, close_bm25_index
+from app.services.vector_index import init_vector_index, close_vector_index
+from app.services.session_cache import init_session_cache, close_session_cache
+from app.services.session_store import init_session_store, close_session_store
+from app.api.routes import health, chat, knowledge_base, webhook, admin
 from app.core.middleware import LoggingMiddleware
 from prometheus_client import CONTENT_TYPE_LATEST, generate_latest, CollectorRegistry, PROCESS_COLLECTOR, PLATFORM_COLLECTOR
 
@@ -46,14 +54,47 @@ async def lifespan(app: FastAPI):
     await init_redis()
     logger.info("Redis initialized")
     
+    # Follow session invalidations for the near-cache
+    await init_session_cache()
+    
+    # Persist sessions to PostgreSQL behind Redis
+    await init_session_store()
+    
     # Initialize Qdrant
     await init_qdrant()
     logger.info("Qdrant initialized")
     
+    # Initialize pooled LLM clients
+    await init_llm()
+    logger.info("LLM clients initialized")
+    
+    # Load local embedding model
+    await init_embeddings()
+    logger.info("Embeddings initialized")
+    
+    # Vectors of the wrong size would make every Qdrant upsert and search fail
+    await verify_embedding_dimension()
+    
+    # Build in-process lexical index
+    await init_bm25_index()
+    logger.info("Lexical index initialized")
+    
+    # Load in-process vector index
+    await init_vector_index()
+    logger.info("Vector index initialized")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down Social Media Chatbot Backend by Astrals Agency")
+    await close_background()
+    await close_session_store()
+    await close_session_cache()
+    await close_vector_index()
+    await close_bm25_index()
+    await close_embeddings()
+    await close_llm()
+    await close_qdrant()
 
 # Create FastAPI app
 app = FastAPI(
@@ -80,6 +121,7 @@ app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(knowledge_base.router, prefix="/api/v1", tags=["knowledge-base"])
 app.include_router(webhook.router, prefix="/api/v1", tags=["webhooks"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
 
 # Prometheus metrics endpoint
 @app.get("/metrics")
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import main
+from app.api.routes import chat as chat_routes
+from app.api.routes import webhook as webhook_routes
+from app.core.database import get_db
+from app.core.redis import get_redis
+
+WORK_SECONDS = 2.0
+DISCONNECT_AFTER = 0.2
+
+class SlowChatService:
+    """Stands in for ChatService; records whether its work was cancelled"""
+
+    cancelled = False
+
+    def __init__(self, db, redis):
+        pass
+
+    async def process_message(self, request):
+        try:
+            await asyncio.sleep(WORK_SECONDS)
+        except asyncio.CancelledError:
+            SlowChatService.cancelled = True
+            raise
+
+async def _no_dependency():
+    yield None
+
+@pytest.fixture
+def app(monkeypatch):
+    SlowChatService.cancelled = False
+    monkeypatch.setattr(chat_routes, "ChatService", SlowChatService)
+    monkeypatch.setattr(webhook_routes, "ChatService", SlowChatService)
+    main.app.dependency_overrides[get_db] = _no_dependency
+    main.app.dependency_overrides[get_redis] = lambda: None
+    yield main.app
+    main.app.dependency_overrides.clear()
+
+async def _call_and_disconnect(app, path: str, payload: dict):
+    """Drive the full ASGI stack the way uvicorn does when the client leaves mid-request"""
+    body = json.dumps(payload).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"test"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    body_sent = False
+    start = time.monotonic()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # uvicorn blocks until the connection closes, then keeps reporting the disconnect
+        await asyncio.sleep(max(0.0, start + DISCONNECT_AFTER - time.monotonic()))
+        return {"type": "http.disconnect"}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return time.monotonic() - start, messages
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path, payload", [
+    ("/api/v1/chat", {"user_id": "u1", "channel": "instagram", "message": "hi"}),
+    ("/api/v1/webhook/instagram", {
+        "entry": [{"messaging": [{"sender": {"id": "u1"}, "message": {"text": "hi"}}]}]
+    }),
+])
+async def test_disconnect_cancels_work_through_middleware(app, path, payload):
+    elapsed, messages = await _call_and_disconnect(app, path, payload)
+
+    assert SlowChatService.cancelled
+    assert elapsed < WORK_SECONDS / 2
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    assert start["status"] == 499
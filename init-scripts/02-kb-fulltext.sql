@@ -0,0 +1,31 @@
+-- Full-text search for kb_entries (lexical leg of hybrid retrieval)
+--
+-- Runs automatically on fresh volumes. For existing deployments apply it once:
+--   docker compose exec postgres psql -U chatbot_user -d chatbot \
+--     -f /docker-entrypoint-initdb.d/02-kb-fulltext.sql
+-- The script is idempotent and safe to re-run.
+
+-- Language-aware tsvector, kept up to date by Postgres itself
+ALTER TABLE kb_entries
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector(
+            CASE language
+                WHEN 'en' THEN 'english'::regconfig
+                WHEN 'id' THEN 'indonesian'::regconfig
+                ELSE 'simple'::regconfig
+            END,
+            coalesce(category, '')
+        ), 'A') ||
+        setweight(to_tsvector(
+            CASE language
+                WHEN 'en' THEN 'english'::regconfig
+                WHEN 'id' THEN 'indonesian'::regconfig
+                ELSE 'simple'::regconfig
+            END,
+            coalesce(canonical_answer, '')
+        ), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_kb_entries_search_vector ON kb_entries USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_kb_entries_language_status ON kb_entries(language, status);
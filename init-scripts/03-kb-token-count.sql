@@ -0,0 +1,8 @@
+-- Precomputed token counts for kb_entries, used by the context packer
+--
+-- Runs automatically on fresh volumes. For existing deployments apply it once:
+--   docker compose exec postgres psql -U chatbot_user -d chatbot \
+--     -f /docker-entrypoint-initdb.d/03-kb-token-count.sql
+-- Rows without a count are estimated at query time until their next update.
+
+ALTER TABLE kb_entries ADD COLUMN IF NOT EXISTS token_count INTEGER;
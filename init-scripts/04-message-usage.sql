@@ -0,0 +1,11 @@
+-- Per-message token usage and fractional model cost
+--
+-- Runs automatically on fresh volumes. For existing deployments apply it once:
+--   docker compose exec postgres psql -U chatbot_user -d chatbot \
+--     -f /docker-entrypoint-initdb.d/04-message-usage.sql
+-- Cheap models cost fractions of a cent per message, so the cost column becomes NUMERIC.
+
+ALTER TABLE messages ALTER COLUMN model_cost_cents TYPE NUMERIC(12,4);
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER DEFAULT 0;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS completion_tokens INTEGER DEFAULT 0;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS embedding_tokens INTEGER DEFAULT 0;